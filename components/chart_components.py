@@ -2,8 +2,10 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 import random
 from services.etf_service import get_etf_historical_data
+from utils.downsampling import downsample_series, needs_webgl
 import config
 
 def display_allocation_pie_chart(allocation_data):
@@ -46,10 +48,39 @@ def display_etf_allocation_pie_chart(etf_allocation_data):
     
     st.plotly_chart(fig, use_container_width=True)
 
-def display_projection_chart(projection_data):
-    """Display a line chart of projected portfolio growth"""
+def display_projection_chart(projection_data, bands=None):
+    """Display a line chart of projected portfolio growth, with optional Monte Carlo percentile bands"""
     fig = go.Figure()
     
+    # Add the 5-95% and 25-75% Monte Carlo bands behind the lines
+    if bands is not None:
+        for lower, upper, opacity in ((5, 95, 0.12), (25, 75, 0.25)):
+            fig.add_trace(go.Scatter(
+                x=bands['year'],
+                y=bands[f'portfolio_p{upper}'],
+                mode='lines',
+                line=dict(width=0),
+                showlegend=False,
+                name=f'Portfolio P{upper}'
+            ))
+            fig.add_trace(go.Scatter(
+                x=bands['year'],
+                y=bands[f'portfolio_p{lower}'],
+                mode='lines',
+                line=dict(width=0),
+                fill='tonexty',
+                fillcolor=f'rgba(0, 104, 201, {opacity})',
+                name=f'Portfolio {lower}th-{upper}th Percentile'
+            ))
+        
+        fig.add_trace(go.Scatter(
+            x=bands['year'],
+            y=bands['portfolio_p50'],
+            mode='lines',
+            name='Portfolio Median (Simulated)',
+            line=dict(color='#0068c9', width=2, dash='dot')
+        ))
+    
     # Add portfolio value line
     fig.add_trace(go.Scatter(
         x=projection_data['year'],
@@ -96,30 +127,53 @@ def display_projection_chart(projection_data):
     
     st.plotly_chart(fig, use_container_width=True)
 
-def display_etf_performance_chart(etf_symbols):
+def display_etf_performance_chart(etf_symbols, years=5, max_points=None):
     """Display a line chart comparing ETF performance"""
-    # Create an empty dataframe for the chart
-    performance_data = pd.DataFrame()
+    # About one point per pixel of chart width is all the browser can show
+    max_points = max_points or config.CHART_WIDTH_PX
     
     # Generate color map for ETFs
     colors = px.colors.qualitative.G10
     color_map = {etf: colors[i % len(colors)] for i, etf in enumerate(etf_symbols)}
     
-    # Get historical data for each ETF
-    for symbol in etf_symbols:
-        data = get_etf_historical_data(symbol)
-        if len(performance_data) == 0:
-            performance_data = data[['date']].copy()
-        
-        performance_data[symbol] = data['value_normalized']
+    # Get daily historical data for each ETF
+    histories = {symbol: get_etf_historical_data(symbol, years, frequency='daily') for symbol in etf_symbols}
+    histories = {symbol: data for symbol, data in histories.items() if not data.empty}
+    if not histories:
+        st.info("No price history available for the selected ETFs")
+        return
+    
+    # Zoom window; every change reruns the page and re-resolves the decimation
+    first_date = min(data['date'].iloc[0] for data in histories.values()).date()
+    last_date = max(data['date'].iloc[-1] for data in histories.values()).date()
+    zoom_start, zoom_end = first_date, last_date
+    if first_date < last_date:
+        zoom_start, zoom_end = st.slider(
+            "Zoom",
+            min_value=first_date,
+            max_value=last_date,
+            value=(first_date, last_date),
+            format="YYYY-MM-DD"
+        )
+    
+    # Downsample only the visible window of each series
+    series = {}
+    for symbol, data in histories.items():
+        dates = data['date'].to_numpy()
+        in_window = (dates >= np.datetime64(zoom_start)) & (dates <= np.datetime64(zoom_end))
+        series[symbol] = downsample_series(dates[in_window], data['value_normalized'].to_numpy()[in_window], max_points)
+    
+    # WebGL keeps charts with many points in total responsive
+    webgl = needs_webgl([len(x) for x, _ in series.values()], config.CHART_WEBGL_THRESHOLD)
+    trace_type = go.Scattergl if webgl else go.Scatter
     
     # Create the figure
     fig = go.Figure()
     
-    for symbol in etf_symbols:
-        fig.add_trace(go.Scatter(
-            x=performance_data['date'],
-            y=performance_data[symbol],
+    for symbol, (x, y) in series.items():
+        fig.add_trace(trace_type(
+            x=x,
+            y=y,
             mode='lines',
             name=symbol,
             line=dict(color=color_map[symbol], width=2)
@@ -181,3 +235,109 @@ def display_alpha_chart(alpha_data):
     fig.update_yaxes(ticksuffix='%')
     
     st.plotly_chart(fig, use_container_width=True)
+
+def display_scenario_heatmap(grid, metric, risk_tolerance, current=None):
+    """
+    Display a precomputed scenario metric across tech allocation and horizon
+    
+    Args:
+        grid: ScenarioGrid from get_scenario_grid
+        metric: One of SCENARIO_METRICS
+        risk_tolerance: Risk level to show
+        current: Optional (tech allocation, horizon) of the user's portfolio to mark
+    """
+    surface = grid.surface(metric, risk_tolerance)
+    
+    # Percentages for rates, Rand for values
+    if metric in ('cagr', 'alpha_cumulative'):
+        z = surface * 100
+        hover_value = '%{z:.2f}%'
+    else:
+        z = surface
+        hover_value = 'R%{z:,.0f}'
+    
+    fig = go.Figure(go.Heatmap(
+        x=grid.horizons,
+        y=grid.tech_allocations * 100,
+        z=z,
+        colorscale='Blues',
+        hovertemplate=f"Tech allocation: %{{y:.0f}}%<br>Horizon: %{{x}} years<br>{hover_value}<extra></extra>"
+    ))
+    
+    # Mark the current portfolio
+    if current is not None:
+        fig.add_trace(go.Scatter(
+            x=[current[1]],
+            y=[current[0] * 100],
+            mode='markers',
+            name='Your Portfolio',
+            marker=dict(color='#ff2b2b', size=12, symbol='x')
+        ))
+    
+    # Update layout
+    fig.update_layout(
+        title=f"{metric.replace('_', ' ').title()} ({risk_tolerance} Risk)",
+        xaxis_title='Investment Duration (Years)',
+        yaxis_title='Tech ETF Allocation (%)',
+        showlegend=False
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+
+def display_efficient_frontier(frontier, current=None):
+    """
+    Display the mandate-constrained efficient frontier
+    
+    Args:
+        frontier: FrontierResult from get_efficient_frontier
+        current: Optional (volatility, expected return) of the user's portfolio
+    """
+    frontier_data = frontier.to_frame()
+    
+    fig = go.Figure()
+    
+    # Add frontier line
+    fig.add_trace(go.Scatter(
+        x=frontier_data['volatility'] * 100,
+        y=frontier_data['expected_return'] * 100,
+        mode='lines',
+        name='Efficient Frontier',
+        line=dict(color='#0068c9', width=3),
+        customdata=frontier_data['tech_allocation'] * 100,
+        hovertemplate="Volatility: %{x:.2f}%<br>Return: %{y:.2f}%<br>Tech: %{customdata:.0f}%<extra></extra>"
+    ))
+    
+    # Add max-Sharpe portfolio
+    best = frontier.max_sharpe
+    if best is not None:
+        fig.add_trace(go.Scatter(
+            x=[frontier.volatility[best] * 100],
+            y=[frontier.expected_return[best] * 100],
+            mode='markers',
+            name=f'Max Sharpe ({frontier.sharpe_ratio[best]:.2f})',
+            marker=dict(color='#29b09d', size=14, symbol='star')
+        ))
+    
+    # Add current portfolio
+    if current is not None:
+        fig.add_trace(go.Scatter(
+            x=[current[0] * 100],
+            y=[current[1] * 100],
+            mode='markers',
+            name='Your Portfolio',
+            marker=dict(color='#ff2b2b', size=12, symbol='x')
+        ))
+    
+    # Update layout
+    fig.update_layout(
+        title='Efficient Frontier (Mandate Constrained)',
+        xaxis_title='Volatility (%)',
+        yaxis_title='Expected Annual Return (%)',
+        legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5)
+    )
+    
+    # Format axes as percentages
+    fig.update_xaxes(ticksuffix='%')
+    fig.update_yaxes(ticksuffix='%')
+    
+    st.plotly_chart(fig, use_container_width=True)
@@ -2,17 +2,22 @@ import streamlit as st
 import pandas as pd
 from database.db_service import get_user_by_id, update_user_portfolio
 from utils.constants import PAGES, RISK_LEVELS
-from services.portfolio_service import get_portfolio_allocation, get_portfolio_value
-from services.projection_service import get_portfolio_projection, calculate_alpha
-from services.etf_service import get_tech_etfs, get_complementary_etfs
+from services.portfolio_context import PortfolioContext
+from services.projection_service import simulate_portfolio_projection
+from services.scenario_service import get_scenario_grid
+from services.optimizer_service import get_user_frontier
+from services.risk_metrics_service import get_etf_risk_metrics, get_portfolio_risk_metrics
+from services.etf_service import get_etf_catalog
 from services.export_service import export_to_csv, create_pdf_report
 from components.chart_components import (
     display_allocation_pie_chart,
     display_projection_chart,
     display_etf_performance_chart,
-    display_alpha_chart
+    display_alpha_chart,
+    display_scenario_heatmap,
+    display_efficient_frontier
 )
-from components.summary_components import display_portfolio_summary, display_etf_list
+from components.summary_components import display_portfolio_summary, display_etf_list, display_risk_metrics_table
 import config
 
 def show_dashboard_page():
@@ -36,6 +41,9 @@ def show_dashboard_page():
     
     st.header(f"{user.first_name}'s Portfolio Dashboard")
     
+    # Values derived from the portfolio, computed at most once per render
+    context = PortfolioContext(user)
+    
     # Portfolio adjustment section in sidebar
     with st.sidebar:
         st.subheader("Adjust Portfolio")
@@ -78,7 +86,7 @@ def show_dashboard_page():
             new_investment_duration = st.slider(
                 "Investment Duration (Years)",
                 min_value=1,
-                max_value=10,
+                max_value=config.MAX_INVESTMENT_DURATION,
                 value=user.investment_duration,
                 step=1
             )
@@ -93,17 +101,12 @@ def show_dashboard_page():
             st.markdown("### ETF Selection")
             
             # Tech ETFs
-            tech_etfs = get_tech_etfs()
-            tech_etf_options = [f"{etf['symbol']} - {etf['name']}" for etf in tech_etfs]
-            tech_etf_symbols = [etf['symbol'] for etf in tech_etfs]
-            user_tech_etfs = user.tech_etfs.split(',') if user.tech_etfs else []
+            catalog = get_etf_catalog()
+            tech_etf_options = catalog.options('Tech ETFs')
+            user_tech_etfs = context.tech_etfs
             
             # Create the display options for the currently selected ETFs
-            user_tech_etf_options = []
-            for symbol in user_tech_etfs:
-                for etf in tech_etfs:
-                    if etf['symbol'] == symbol:
-                        user_tech_etf_options.append(f"{symbol} - {etf['name']}")
+            user_tech_etf_options = catalog.options_for(user_tech_etfs, 'Tech ETFs')
             
             new_selected_tech_etf_options = st.multiselect(
                 "Tech ETFs",
@@ -114,17 +117,11 @@ def show_dashboard_page():
             new_selected_tech_etfs = [option.split(" - ")[0] for option in new_selected_tech_etf_options]
             
             # Complementary ETFs
-            complementary_etfs = get_complementary_etfs()
-            complementary_etf_options = [f"{etf['symbol']} - {etf['name']}" for etf in complementary_etfs]
-            complementary_etf_symbols = [etf['symbol'] for etf in complementary_etfs]
-            user_complementary_etfs = user.complementary_etfs.split(',') if user.complementary_etfs else []
+            complementary_etf_options = catalog.options('Complementary ETFs')
+            user_complementary_etfs = context.complementary_etfs
             
             # Create the display options for the currently selected ETFs
-            user_complementary_etf_options = []
-            for symbol in user_complementary_etfs:
-                for etf in complementary_etfs:
-                    if etf['symbol'] == symbol:
-                        user_complementary_etf_options.append(f"{symbol} - {etf['name']}")
+            user_complementary_etf_options = catalog.options_for(user_complementary_etfs, 'Complementary ETFs')
             
             new_selected_complementary_etf_options = st.multiselect(
                 "Complementary ETFs",
@@ -172,8 +169,7 @@ def show_dashboard_page():
     # Tab 1: Portfolio Overview
     with tab1:
         # Get portfolio data
-        allocation_data = get_portfolio_allocation(user)
-        current_value = get_portfolio_value(user)
+        allocation_data = context.allocation_data
         
         # Display summary metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -193,47 +189,85 @@ def show_dashboard_page():
             display_allocation_pie_chart(allocation_data)
         
         with col2:
-            display_portfolio_summary(user, current_value)
+            display_portfolio_summary(context)
         
         # ETF list
         st.subheader("Selected ETFs")
-        display_etf_list(user)
+        display_etf_list(context)
     
     # Tab 2: Projections
     with tab2:
-        projection_data = get_portfolio_projection(user)
-        alpha_data = calculate_alpha(user)
+        projection_result = context.projection_result
+        projection_data = projection_result.projection
+        alpha_data = projection_result.alpha
         
         # Summary metrics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            final_value = projection_data["portfolio_value"].iloc[-1]
-            initial_with_contributions = user.initial_investment + (user.monthly_contribution * 12 * user.investment_duration)
-            total_profit = final_value - initial_with_contributions
-            st.metric("Projected Final Value", f"R{final_value:,.2f}")
+            st.metric("Projected Final Value", f"R{projection_result.final_value:,.2f}")
         with col2:
-            st.metric("Total Profit", f"R{total_profit:,.2f}")
+            st.metric("Total Profit", f"R{projection_result.total_profit:,.2f}")
         with col3:
-            cagr = ((final_value / user.initial_investment) ** (1 / user.investment_duration) - 1) * 100
+            cagr = projection_result.cagr * 100
             st.metric("Projected CAGR", f"{cagr:.2f}%")
         with col4:
-            final_alpha = alpha_data["alpha_cumulative"].iloc[-1] * 100
+            final_alpha = projection_result.final_alpha * 100
             st.metric("Alpha vs S&P 500", f"{final_alpha:.2f}%", f"{final_alpha - config.ALPHA_TARGET * 100:.2f}%")
+
+        # The information ratio is undefined when the projection tracks the benchmark exactly
+        information_ratio = projection_result.information_ratio
+        hit_rate = projection_result.target_hit_rate
+        st.caption(
+            f"Tracking error {projection_result.tracking_error * 100:.2f}% · "
+            f"Information ratio {'n/a' if pd.isna(information_ratio) else f'{information_ratio:.2f}'} · "
+            f"Years meeting the {config.ALPHA_TARGET * 100:.0f}% alpha target: "
+            f"{'n/a' if pd.isna(hit_rate) else f'{hit_rate * 100:.0f}%'}"
+        )
         
         # Projection chart
         st.subheader("Investment Growth Projection")
-        display_projection_chart(projection_data)
+        show_bands = st.checkbox(
+            "Show Monte Carlo percentile bands",
+            help=f"Simulates {config.MONTE_CARLO_PATHS:,} market paths using the volatility for your risk level"
+        )
+        bands = simulate_portfolio_projection(user) if show_bands else None
+        display_projection_chart(projection_data, bands)
         
         # Alpha chart
         st.subheader("Performance vs S&P 500")
         display_alpha_chart(alpha_data)
         
+        # What-if scenarios, precomputed for every allocation, risk level and horizon
+        st.subheader("What-if Scenarios")
+        scenario_grid = get_scenario_grid(user.initial_investment, user.monthly_contribution)
+        scenario_labels = {
+            "Projected Final Value": "portfolio_value",
+            "Total Profit": "total_profit",
+            "Projected CAGR": "cagr",
+            "Alpha vs S&P 500": "alpha_cumulative"
+        }
+        col1, col2 = st.columns(2)
+        with col1:
+            scenario_metric = st.selectbox("Metric", list(scenario_labels))
+        with col2:
+            scenario_risk = st.select_slider(
+                "Scenario Risk Tolerance",
+                options=scenario_grid.risk_levels,
+                value=user.risk_tolerance
+            )
+        display_scenario_heatmap(
+            scenario_grid,
+            scenario_labels[scenario_metric],
+            scenario_risk,
+            current=(user.tech_allocation, user.investment_duration)
+        )
+        
         # Export options
         st.subheader("Export Reports")
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Export as CSV"):
-                csv_data = export_to_csv(user, projection_data, alpha_data)
+                csv_data = export_to_csv(context)
                 st.download_button(
                     label="Download CSV",
                     data=csv_data,
@@ -243,7 +277,7 @@ def show_dashboard_page():
         
         with col2:
             if st.button("Generate PDF Report"):
-                pdf_data = create_pdf_report(user, projection_data, alpha_data)
+                pdf_data = create_pdf_report(context)
                 st.download_button(
                     label="Download PDF",
                     data=pdf_data,
@@ -256,19 +290,15 @@ def show_dashboard_page():
         st.subheader("ETF Performance Analysis")
         
         # Get user's ETFs
-        user_tech_etfs = user.tech_etfs.split(',') if user.tech_etfs else []
-        user_complementary_etfs = user.complementary_etfs.split(',') if user.complementary_etfs else []
-        
-        # Get ETF details for display
-        tech_etfs_map = {etf['symbol']: etf['name'] for etf in get_tech_etfs()}
-        comp_etfs_map = {etf['symbol']: etf['name'] for etf in get_complementary_etfs()}
-        etfs_map = {**tech_etfs_map, **comp_etfs_map}
+        user_tech_etfs = context.tech_etfs
+        user_complementary_etfs = context.complementary_etfs
         
         # Create options for the multiselect with both symbol and name
-        etf_options = [f"{symbol} - {etfs_map.get(symbol, symbol)}" for symbol in user_tech_etfs + user_complementary_etfs]
+        catalog = get_etf_catalog()
+        etf_options = [catalog.option(symbol) for symbol in user_tech_etfs + user_complementary_etfs]
         default_options = []
         if user_tech_etfs and user_complementary_etfs:
-            default_options = [f"{symbol} - {etfs_map.get(symbol, symbol)}" for symbol in user_tech_etfs[:2] + user_complementary_etfs[:1]]
+            default_options = [catalog.option(symbol) for symbol in user_tech_etfs[:2] + user_complementary_etfs[:1]]
         
         selected_etf_options = st.multiselect(
             "Select ETFs to Compare",
@@ -278,10 +308,40 @@ def show_dashboard_page():
         # Extract just the symbols from the selected options
         selected_etfs_for_chart = [option.split(" - ")[0] for option in selected_etf_options]
         
+        history_years = st.select_slider(
+            "History (Years)",
+            options=[1, 3, 5, 10, 20],
+            value=5
+        )
+        
         if selected_etfs_for_chart:
-            display_etf_performance_chart(selected_etfs_for_chart)
+            display_etf_performance_chart(selected_etfs_for_chart, years=history_years)
+            
+            # Risk metrics for the selected ETFs and the whole portfolio over the same history
+            if st.checkbox("Show risk metrics"):
+                risk_metrics = get_etf_risk_metrics(selected_etfs_for_chart, years=history_years)
+                portfolio_risk = get_portfolio_risk_metrics([user], years=history_years, allocations=[context.allocations])
+                if not portfolio_risk.empty:
+                    portfolio_risk = portfolio_risk.drop(columns=['user_id']).assign(name='Your Portfolio')
+                    risk_metrics = pd.concat([risk_metrics, portfolio_risk], ignore_index=True)
+                display_risk_metrics_table(risk_metrics)
         else:
             st.info("Please select ETFs to compare their performance")
+        
+        # Efficient frontier over the user's ETFs within the mandate
+        st.subheader("Efficient Frontier")
+        frontier, current_point = get_user_frontier(user, allocations=context.allocations)
+        if frontier is not None:
+            display_efficient_frontier(frontier, current_point)
+            
+            best_weights = frontier.max_sharpe_weights()
+            if best_weights:
+                st.caption(
+                    f"Max-Sharpe portfolio (risk-free rate {config.RISK_FREE_RATE * 100:.1f}%): "
+                    + ", ".join(f"{symbol} {weight * 100:.1f}%" for symbol, weight in best_weights.items())
+                )
+        else:
+            st.info("Select ETFs to see the efficient frontier")
             
     # Tab 4: Portfolio History
     with tab4:
@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 from database.db_service import create_user, get_user_by_id
 from utils.constants import PAGES, RISK_LEVELS
-from services.etf_service import get_tech_etfs, get_complementary_etfs
+from services.etf_service import get_tech_etfs, get_complementary_etfs, get_etf_catalog
 import config
 
 def show_setup_page():
@@ -80,7 +80,7 @@ def show_setup_page():
         investment_duration = st.slider(
             "Investment Duration (Years)",
             min_value=1,
-            max_value=10,
+            max_value=config.MAX_INVESTMENT_DURATION,
             value=config.DEFAULT_INVESTMENT_HORIZON,
             step=1,
             help="Select your investment time horizon"
@@ -98,9 +98,8 @@ def show_setup_page():
         st.subheader("ETF Selection")
         
         # Tech ETFs
-        tech_etfs = get_tech_etfs()
-        tech_etf_options = [f"{etf['symbol']} - {etf['name']}" for etf in tech_etfs]
-        tech_etf_symbols = [etf['symbol'] for etf in tech_etfs]
+        catalog = get_etf_catalog()
+        tech_etf_options = catalog.options('Tech ETFs')
         
         selected_tech_etf_options = st.multiselect(
             "Select Tech ETFs",
@@ -112,9 +111,7 @@ def show_setup_page():
         selected_tech_etfs = [option.split(" - ")[0] for option in selected_tech_etf_options]
         
         # Complementary ETFs
-        complementary_etfs = get_complementary_etfs()
-        complementary_etf_options = [f"{etf['symbol']} - {etf['name']}" for etf in complementary_etfs]
-        complementary_etf_symbols = [etf['symbol'] for etf in complementary_etfs]
+        complementary_etf_options = catalog.options('Complementary ETFs')
         
         selected_complementary_etf_options = st.multiselect(
             "Select Complementary ETFs",
@@ -170,7 +167,7 @@ def show_setup_page():
     # Display some information about ETFs with tooltips
     with st.expander("Available ETF Information"):
         st.subheader("Tech ETFs")
-        tech_df = pd.DataFrame(tech_etfs)
+        tech_df = pd.DataFrame(get_tech_etfs())
         st.dataframe(
             tech_df,
             column_config={
@@ -192,7 +189,7 @@ def show_setup_page():
         )
         
         st.subheader("Complementary ETFs")
-        comp_df = pd.DataFrame(complementary_etfs)
+        comp_df = pd.DataFrame(get_complementary_etfs())
         st.dataframe(
             comp_df,
             column_config={
@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
-from services.portfolio_service import calculate_etf_allocations
-from services.etf_service import get_etf_details, get_etf_return
 
-def display_portfolio_summary(user, current_value):
-    """Display a summary of the portfolio"""
+def display_portfolio_summary(context):
+    """Display a summary of the portfolio from a PortfolioContext"""
+    user = context.user
+    current_value = context.current_value
+    
     # Calculate projected value at end of investment duration
     # This is a simplified calculation for display purposes
     annual_return = 0.08  # Assumed annual return for summary display
@@ -60,29 +61,24 @@ def display_portfolio_summary(user, current_value):
         use_container_width=True
     )
 
-def display_etf_list(user):
-    """Display a list of ETFs in the portfolio with their allocations"""
-    # Get ETF allocations
-    etf_allocations = calculate_etf_allocations(user)
+def display_etf_list(context):
+    """Display a list of ETFs in the portfolio with their allocations from a PortfolioContext"""
+    etf_table = context.etf_table
     
     # Create dataframes for tech and complementary ETFs
     tech_etfs = []
     complementary_etfs = []
     
-    for etf in etf_allocations:
-        # Get ETF details and returns
-        details = get_etf_details(etf['symbol'])
-        returns = get_etf_return(etf['symbol'])
-        
+    for etf in etf_table.to_dict('records'):
         etf_data = {
             'Symbol': etf['symbol'],
-            'Name': details['name'],
+            'Name': etf['name'],
             'Category': etf['category'],
             'Allocation (%)': f"{etf['allocation'] * 100:.2f}%",
             'Value (ZAR)': f"R{etf['value']:,.2f}",
-            '1Y Return (%)': f"{returns['1y'] * 100:.2f}%",
-            '3Y Return (%)': f"{returns['3y'] * 100:.2f}%",
-            '5Y Return (%)': f"{returns['5y'] * 100:.2f}%"
+            '1Y Return (%)': f"{etf['1y'] * 100:.2f}%",
+            '3Y Return (%)': f"{etf['3y'] * 100:.2f}%",
+            '5Y Return (%)': f"{etf['5y'] * 100:.2f}%"
         }
         
         if etf['category'] == 'Tech ETFs':
@@ -115,3 +111,23 @@ def display_etf_list(user):
             hide_index=True,
             use_container_width=True
         )
+
+def display_risk_metrics_table(risk_metrics):
+    """Display risk metrics from compute_risk_metrics, one row per ETF or portfolio"""
+    risk_df = pd.DataFrame({
+        'Name': risk_metrics['name'],
+        'Annual Return': [f'{value * 100:.2f}%' for value in risk_metrics['annual_return']],
+        'Volatility': [f'{value * 100:.2f}%' for value in risk_metrics['volatility']],
+        'VaR 95% (1 Day)': [f'{value * 100:.2f}%' for value in risk_metrics['var_historical']],
+        'CVaR 95% (1 Day)': [f'{value * 100:.2f}%' for value in risk_metrics['cvar_historical']],
+        'Max Drawdown': [f'{value * 100:.2f}%' for value in risk_metrics['max_drawdown']],
+        'Drawdown Duration (Days)': risk_metrics['max_drawdown_duration'],
+        'Sharpe Ratio': [f'{value:.2f}' for value in risk_metrics['sharpe_ratio']],
+        'Sortino Ratio': [f'{value:.2f}' for value in risk_metrics['sortino_ratio']]
+    })
+    
+    st.dataframe(
+        risk_df,
+        hide_index=True,
+        use_container_width=True
+    )
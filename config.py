@@ -45,6 +45,12 @@ if not DATABASE_URL:
         # Default to SQLite if the dialect is not recognized
         DATABASE_URL = f"sqlite:///{SQLITE_DB_PATH}"
 
+# Connection pool settings (see database/db_service.py)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # Connections kept open
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Extra connections allowed under load
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+
 # Application settings
 APP_TITLE = "Tech-Forward Investment Portfolio Manager"
 APP_DESCRIPTION = "Manage and visualize your tech-focused investment portfolio based on the mandate."
@@ -52,5 +58,35 @@ APP_DESCRIPTION = "Manage and visualize your tech-focused investment portfolio b
 # Portfolio settings
 DEFAULT_TECH_ALLOCATION = 0.7  # 70% in Tech ETFs
 DEFAULT_COMPLEMENTARY_ALLOCATION = 0.3  # 30% in Complementary Sector ETFs
+MIN_TECH_ALLOCATION = 0.6  # Mandate range for the Tech ETF allocation
+MAX_TECH_ALLOCATION = 0.8
 DEFAULT_INVESTMENT_HORIZON = 5  # 5-year horizon
+MAX_INVESTMENT_DURATION = 50  # Longest projection horizon in years (600 monthly steps)
 ALPHA_TARGET = 0.01  # 1% annual outperformance
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.04"))  # Annual rate used for Sharpe ratios
+REBALANCE_DRIFT_THRESHOLD = float(os.getenv("REBALANCE_DRIFT_THRESHOLD", "0.05"))  # Largest tolerated per-ETF weight drift
+REBALANCE_BATCH_SIZE = int(os.getenv("REBALANCE_BATCH_SIZE", "10000"))  # Portfolios checked per vectorized batch
+
+# Cache settings
+HISTORY_CACHE_MAX_ENTRIES = int(os.getenv("HISTORY_CACHE_MAX_ENTRIES", "256"))
+HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+PROJECTION_CACHE_MAX_ENTRIES = int(os.getenv("PROJECTION_CACHE_MAX_ENTRIES", "1024"))
+WARM_START_CACHE_MAX_ENTRIES = int(os.getenv("WARM_START_CACHE_MAX_ENTRIES", "64"))
+WARM_START_CACHE_MAX_BYTES = int(os.getenv("WARM_START_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# On-disk price store settings (see data/price_store.py)
+PRICE_STORE_YEARS = int(os.getenv("PRICE_STORE_YEARS", "20"))
+PRICE_STORE_DTYPE = os.getenv("PRICE_STORE_DTYPE", "float64")
+
+# Chart settings: points kept per series (about one per pixel of chart width)
+# and the total points across a chart's traces above which WebGL rendering is used
+CHART_WIDTH_PX = int(os.getenv("CHART_WIDTH_PX", "1200"))
+CHART_WEBGL_THRESHOLD = int(os.getenv("CHART_WEBGL_THRESHOLD", "1500"))
+
+# Root seed for all synthetic data streams (see utils/rng.py)
+RANDOM_SEED = int(os.getenv("RANDOM_SEED", "20240601"))
+
+# Monte Carlo projection settings
+MONTE_CARLO_PATHS = int(os.getenv("MONTE_CARLO_PATHS", "10000"))
+MONTE_CARLO_CHUNK_ELEMENTS = int(os.getenv("MONTE_CARLO_CHUNK_ELEMENTS", str(2_000_000)))  # Random draws per chunk
+MONTE_CARLO_WORKERS = int(os.getenv("MONTE_CARLO_WORKERS", "0"))  # 0 runs in-process
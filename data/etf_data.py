@@ -1,12 +1,64 @@
 import pandas as pd
 import numpy as np
-import random
 from datetime import datetime, timedelta
+from utils.rng import get_generator
+
+# Generated prices have one row per calendar day, so annual parameters are spread over 365 rows
+DAYS_PER_YEAR = 365
+
+def _to_datetime(value):
+    """Convert a 'YYYY-MM-DD' string to a datetime, leaving other values untouched"""
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+def generate_historical_price_matrix(symbols, start_date, end_date, initial_prices=100.0, annual_returns=0.1, volatilities=0.15):
+    """
+    Generate synthetic historical prices for several ETFs in one pass
+
+    Args:
+        symbols: List of ETF symbols, one column per symbol
+        start_date: Start date for the data
+        end_date: End date for the data
+        initial_prices: Initial price, either a scalar or one value per symbol
+        annual_returns: Expected annual return, either a scalar or one value per symbol
+        volatilities: Annual volatility, either a scalar or one value per symbol
+
+    Returns:
+        Tuple of (DatetimeIndex of daily dates, float64 array of shape (dates, symbols))
+    """
+    start_date = _to_datetime(start_date)
+    end_date = _to_datetime(end_date)
+
+    # One daily date per day in [start_date, end_date)
+    days = max((end_date - start_date).days, 0)
+    dates = pd.date_range(start=start_date, periods=days, freq='D')
+
+    # Broadcast the per-symbol parameters to one value per column
+    symbol_count = len(symbols)
+    initial_prices = np.broadcast_to(np.asarray(initial_prices, dtype=np.float64), (symbol_count,))
+    annual_returns = np.broadcast_to(np.asarray(annual_returns, dtype=np.float64), (symbol_count,))
+    volatilities = np.broadcast_to(np.asarray(volatilities, dtype=np.float64), (symbol_count,))
+
+    # Calculate daily parameters
+    daily_returns = annual_returns / DAYS_PER_YEAR
+    daily_volatilities = volatilities / np.sqrt(DAYS_PER_YEAR)
+
+    # Generate random returns, each symbol drawing from its own stream
+    returns = np.empty((days, symbol_count), dtype=np.float64)
+    for column, symbol in enumerate(symbols):
+        generator = get_generator(symbol, 'daily_prices', end_date)
+        returns[:, column] = generator.normal(daily_returns[column], daily_volatilities[column], size=days)
+
+    # Compound the returns down each column
+    prices = initial_prices * np.cumprod(1 + returns, axis=0)
+
+    return dates, prices
 
 def generate_etf_historical_data(symbol, start_date, end_date, initial_price=100.0, annual_return=0.1, volatility=0.15):
     """
     Generate synthetic historical data for an ETF
-    
+
     Args:
         symbol: ETF symbol
         start_date: Start date for the data
@@ -14,59 +66,55 @@ def generate_etf_historical_data(symbol, start_date, end_date, initial_price=100
         initial_price: Initial price
         annual_return: Expected annual return
         volatility: Annual volatility
-    
+
     Returns:
         DataFrame with historical data
     """
-    # Convert dates to datetime if they are strings
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, '%Y-%m-%d')
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, '%Y-%m-%d')
-    
-    # Calculate number of days
-    days = (end_date - start_date).days
-    
-    # Generate dates
-    dates = [start_date + timedelta(days=i) for i in range(days)]
-    
-    # Set random seed based on symbol for consistency
-    random.seed(sum(ord(c) for c in symbol))
-    
-    # Calculate daily parameters
-    daily_return = annual_return / 252
-    daily_volatility = volatility / np.sqrt(252)
-    
-    # Generate random returns
-    returns = np.random.normal(daily_return, daily_volatility, days)
-    
-    # Calculate prices
-    prices = [initial_price]
-    for ret in returns:
-        prices.append(prices[-1] * (1 + ret))
-    prices = prices[1:]  # Remove the initial price
-    
+    dates, prices = generate_historical_price_matrix(
+        [symbol],
+        start_date,
+        end_date,
+        initial_prices=initial_price,
+        annual_returns=annual_return,
+        volatilities=volatility
+    )
+
     # Create dataframe
     df = pd.DataFrame({
         'date': dates,
-        'price': prices
+        'price': prices[:, 0]
     })
-    
+
     return df
 
 def get_sp500_historical_data(start_date, end_date):
     """
-    Generate synthetic historical data for S&P 500
-    
+    Get historical data for S&P 500
+
     Args:
         start_date: Start date for the data
         end_date: End date for the data
-    
+
     Returns:
         DataFrame with historical data
     """
+    from services.etf_service import get_price_store, SP500_SYMBOL
+
+    start_date = _to_datetime(start_date)
+    end_date = _to_datetime(end_date)
+    last_date = end_date - timedelta(days=1)
+
+    # Read a zero-copy slice from the price store when it covers the range
+    store = get_price_store()
+    if store.covers([SP500_SYMBOL], start_date, last_date):
+        dates, prices = store.read(SP500_SYMBOL, start_date, last_date)
+        return pd.DataFrame({
+            'date': dates,
+            'price': prices
+        })
+
     return generate_etf_historical_data(
-        symbol='SPY',
+        symbol=SP500_SYMBOL,
         start_date=start_date,
         end_date=end_date,
         initial_price=4000.0,
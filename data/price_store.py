@@ -0,0 +1,279 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Default location of the on-disk price store
+PRICE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_store')
+
+HEADER_FILE = 'header.json'
+DATA_FILE = 'prices.bin'  # Data file of stores written before data files were versioned
+LOCK_FILE = '.lock'
+
+class PriceStore:
+    """
+    Memory-mapped (dates x symbols) matrix of daily prices
+
+    The matrix is stored row-major in a data file, so appending dates only
+    appends bytes to the end of the file. header.json holds the symbol order,
+    the first date, the number of rows, the dtype and the name of the data
+    file. Rows are always written before the header, and create() writes a
+    new versioned data file instead of replacing the mapped one, so replacing
+    the header is the only commit point: readers never see a partially
+    appended date or a header describing another file. Every process maps
+    the same file through the page cache.
+    """
+
+    def __init__(self, directory=PRICE_STORE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    @property
+    def header_path(self):
+        return os.path.join(self.directory, HEADER_FILE)
+
+    def _data_path(self, header):
+        """Path of the data file a header describes"""
+        return os.path.join(self.directory, header.get('data_file', DATA_FILE))
+
+    def _read_header(self):
+        with open(self.header_path) as f:
+            return json.load(f)
+
+    def exists(self):
+        """Check whether the store has been created on disk"""
+        if not os.path.exists(self.header_path):
+            return False
+        try:
+            return os.path.exists(self._data_path(self._read_header()))
+        except (OSError, ValueError):
+            return False
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers within this process and, where supported, across processes"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_header(self, header):
+        """Atomically replace the header file"""
+        temp_path = self.header_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(header, f)
+        os.replace(temp_path, self.header_path)
+
+    def _refresh(self):
+        """
+        Get the current (header, matrix, symbol index) snapshot, remapping the
+        matrix if the header changed since it was last read
+
+        Readers must use only the returned snapshot: writers reset the cached
+        one concurrently, and a snapshot's header always matches its matrix.
+        """
+        while True:
+            mtime = os.stat(self.header_path).st_mtime_ns
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.mtime == mtime:
+                return snapshot
+
+            header = self._read_header()
+            rows = header['rows']
+            columns = len(header['symbols'])
+            if rows == 0:
+                matrix = np.empty((0, columns), dtype=header['dtype'])
+                break
+            try:
+                matrix = np.memmap(self._data_path(header), dtype=header['dtype'], mode='r', shape=(rows, columns))
+                break
+            except FileNotFoundError:
+                # create() replaced the store after the header was read; read the new header
+                continue
+
+        snapshot = _Snapshot(header, mtime, matrix)
+        self._snapshot = snapshot
+        return snapshot
+
+    def create(self, symbols, start_date, prices, dtype='float64'):
+        """
+        Create the store, replacing any existing one
+
+        Args:
+            symbols: List of symbols, one per column
+            start_date: Date of the first row (rows are consecutive days)
+            prices: Array of shape (dates, symbols)
+            dtype: On-disk dtype, float64 or float32
+        """
+        prices = np.ascontiguousarray(prices, dtype=dtype)
+        with self._write_lock():
+            try:
+                previous = self._read_header()
+            except (OSError, ValueError):
+                previous = None
+
+            # Write the matrix under a new name; readers switch to it with the header
+            version = previous.get('version', 0) + 1 if previous else 1
+            data_file = f'prices-{version}.bin'
+            data_path = os.path.join(self.directory, data_file)
+            temp_path = data_path + '.tmp'
+            prices.tofile(temp_path)
+            os.replace(temp_path, data_path)
+            self._write_header({
+                'symbols': list(symbols),
+                'start_date': pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+                'rows': int(prices.shape[0]),
+                'dtype': np.dtype(dtype).name,
+                'version': version,
+                'data_file': data_file
+            })
+            self._snapshot = None
+
+            # Existing mappings keep the old file's pages; only its name goes away
+            if previous is not None and self._data_path(previous) != data_path:
+                try:
+                    os.remove(self._data_path(previous))
+                except OSError:
+                    pass
+
+    def append(self, prices, start_date):
+        """
+        Append rows for consecutive days starting at start_date
+
+        Rows for dates that are already stored (e.g. appended concurrently by
+        another worker) are skipped, so appending is idempotent.
+        """
+        with self._write_lock():
+            self._snapshot = None
+            snapshot = self._refresh()
+            header = dict(snapshot.header)
+            prices = np.ascontiguousarray(prices, dtype=header['dtype'])
+            if prices.ndim != 2 or prices.shape[1] != len(header['symbols']):
+                raise ValueError('Appended rows must have one column per stored symbol')
+
+            next_date = pd.Timestamp(snapshot.end_date) + timedelta(days=1)
+            overlap = (next_date - pd.Timestamp(start_date).normalize()).days
+            if overlap < 0:
+                raise ValueError(f'Appended rows start after {next_date:%Y-%m-%d}, leaving a gap')
+            prices = prices[overlap:]
+            if len(prices) == 0:
+                return
+
+            # Drop any bytes left behind by an interrupted append before writing
+            row_bytes = len(header['symbols']) * np.dtype(header['dtype']).itemsize
+            with open(self._data_path(header), 'r+b') as f:
+                f.truncate(header['rows'] * row_bytes)
+                f.seek(0, os.SEEK_END)
+                prices.tofile(f)
+
+            header['rows'] += int(prices.shape[0])
+            self._write_header(header)
+            self._snapshot = None
+
+    @property
+    def symbols(self):
+        return list(self._refresh().header['symbols'])
+
+    @property
+    def start_date(self):
+        return self._refresh().start_date
+
+    @property
+    def end_date(self):
+        """Date of the last stored row"""
+        return self._refresh().end_date
+
+    @property
+    def dates(self):
+        snapshot = self._refresh()
+        return pd.date_range(start=snapshot.start_date, periods=snapshot.rows, freq='D')
+
+    def last_prices(self):
+        """Get the last stored row as an array with one price per symbol"""
+        return np.array(self._refresh().matrix[-1], dtype=np.float64)
+
+    def has_symbol(self, symbol):
+        return symbol in self._refresh().symbol_index
+
+    def covers(self, symbols, start_date, end_date):
+        """Check whether every symbol and the whole [start_date, end_date] range are stored"""
+        if not self.exists():
+            return False
+        snapshot = self._refresh()
+        return (
+            all(symbol in snapshot.symbol_index for symbol in symbols)
+            and pd.Timestamp(start_date).normalize() >= pd.Timestamp(snapshot.start_date)
+            and pd.Timestamp(end_date).normalize() <= pd.Timestamp(snapshot.end_date)
+        )
+
+    def read(self, symbols, start_date=None, end_date=None):
+        """
+        Read prices for some symbols over an inclusive date range
+
+        Args:
+            symbols: A single symbol or a list of symbols
+            start_date: First date to read (defaults to the first stored date)
+            end_date: Last date to read (defaults to the last stored date)
+
+        Returns:
+            Tuple of (DatetimeIndex, prices). For a single symbol, prices is a
+            zero-copy 1-D view of the mapped file; for a list it is a
+            (dates x symbols) array, copied only when the columns are not
+            one contiguous block.
+        """
+        snapshot = self._refresh()
+        first, last = snapshot.row_range(start_date, end_date)
+        dates = pd.date_range(
+            start=snapshot.start_date + timedelta(days=first),
+            periods=max(last - first, 0),
+            freq='D'
+        )
+
+        matrix = snapshot.matrix
+        if isinstance(symbols, str):
+            return dates, matrix[first:last, snapshot.symbol_index[symbols]]
+
+        columns = [snapshot.symbol_index[symbol] for symbol in symbols]
+        if columns and columns == list(range(columns[0], columns[0] + len(columns))):
+            return dates, matrix[first:last, columns[0]:columns[0] + len(columns)]
+        return dates, matrix[first:last][:, columns]
+
+class _Snapshot:
+    """One consistent view of the store: a header and the matrix mapped with its shape"""
+
+    __slots__ = ('header', 'mtime', 'matrix', 'symbol_index', 'start_date', 'rows')
+
+    def __init__(self, header, mtime, matrix):
+        self.header = header
+        self.mtime = mtime
+        self.matrix = matrix
+        self.symbol_index = {symbol: i for i, symbol in enumerate(header['symbols'])}
+        self.start_date = datetime.strptime(header['start_date'], '%Y-%m-%d')
+        self.rows = header['rows']
+
+    @property
+    def end_date(self):
+        """Date of the last stored row"""
+        return self.start_date + timedelta(days=self.rows - 1)
+
+    def row_range(self, start_date, end_date):
+        """Convert an inclusive date range to a clipped [first, last) row range"""
+        store_start = pd.Timestamp(self.start_date)
+        first = 0 if start_date is None else (pd.Timestamp(start_date).normalize() - store_start).days
+        last = self.rows if end_date is None else (pd.Timestamp(end_date).normalize() - store_start).days + 1
+        return max(first, 0), min(max(last, 0), self.rows)
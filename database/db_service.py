@@ -1,28 +1,81 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, event, select, insert, delete, func, union_all
+from sqlalchemy import exc as sqlalchemy_exc
+from sqlalchemy.orm import sessionmaker, scoped_session, selectinload
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from database.models import Base, User, ETF, PortfolioSnapshot, ETFSnapshot
-from services.etf_service import get_tech_etfs, get_complementary_etfs, get_etf_return
+from database.models import Base, User, ETF, PortfolioSnapshot, ETFSnapshot, ETFPrice, Holding, HoldingTransaction
+from services.etf_service import get_tech_etfs, get_complementary_etfs, get_etf_returns
 import config
 from datetime import datetime
 
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sqlalchemy_exc.TimeoutError:
+            _record_pool_metric('timeouts')
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with _pool_metrics_lock:
+                _pool_metrics['wait_seconds_total'] += waited
+                _pool_metrics['wait_seconds_max'] = max(_pool_metrics['wait_seconds_max'], waited)
+
+# Pool counters, updated by InstrumentedQueuePool and the pool event listeners below
+_pool_metrics = {
+    'connects': 0,
+    'checkouts': 0,
+    'checkins': 0,
+    'invalidations': 0,
+    'timeouts': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0
+}
+_pool_metrics_lock = threading.Lock()
+
+def _record_pool_metric(name):
+    with _pool_metrics_lock:
+        _pool_metrics[name] += 1
+
 # Create engine with appropriate configuration based on database type
-if config.DATABASE_URL.startswith('sqlite'):
+database_url = str(config.DATABASE_URL)
+pool_settings = {
+    'poolclass': InstrumentedQueuePool,
+    'pool_size': config.DB_POOL_SIZE,
+    'max_overflow': config.DB_MAX_OVERFLOW,
+    'pool_timeout': config.DB_POOL_TIMEOUT,
+    'pool_recycle': config.DB_POOL_RECYCLE,
+    'pool_use_lifo': True  # Reuse warm connections so idle ones can be recycled
+}
+
+if database_url.startswith('sqlite'):
     engine = create_engine(
         config.DATABASE_URL,
-        pool_pre_ping=True,
-        connect_args={'check_same_thread': False}
+        connect_args={'check_same_thread': False, 'timeout': config.DB_POOL_TIMEOUT},
+        **pool_settings
     )
+
+    @event.listens_for(engine, 'connect')
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        """Let readers proceed while a writer commits"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
 else:
     # PostgreSQL configuration
     engine = create_engine(
         config.DATABASE_URL,
         pool_pre_ping=True,
-        pool_recycle=300,
-        pool_size=5,
-        max_overflow=10,
-        pool_timeout=30,
         connect_args={
             'sslmode': 'require',
             'connect_timeout': '30',
@@ -30,11 +83,87 @@ else:
             'keepalives_idle': '30',
             'keepalives_interval': '10',
             'keepalives_count': '5'
-        }
+        },
+        **pool_settings
     )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@event.listens_for(engine, 'connect')
+def _count_connect(dbapi_connection, connection_record):
+    _record_pool_metric('connects')
+
+@event.listens_for(engine, 'checkout')
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    _record_pool_metric('checkouts')
+
+@event.listens_for(engine, 'checkin')
+def _count_checkin(dbapi_connection, connection_record):
+    _record_pool_metric('checkins')
+
+@event.listens_for(engine, 'invalidate')
+def _count_invalidation(dbapi_connection, connection_record, exception):
+    _record_pool_metric('invalidations')
+
+def get_pool_metrics():
+    """
+    Get connection pool counters and the pool's current state
+
+    Returns:
+        Dictionary with connect/checkout/checkin/invalidation/timeout counts, total and
+        longest checkout wait in seconds, and the pool's size, checked_out and overflow
+    """
+    with _pool_metrics_lock:
+        metrics = dict(_pool_metrics)
+    metrics['size'] = engine.pool.size()
+    metrics['checked_out'] = engine.pool.checkedout()
+    metrics['overflow'] = engine.pool.overflow()
+    return metrics
+
+# One session per thread (a Streamlit rerun runs on its own thread); objects stay
+# usable after commit so pages can read them without reloading
+Session = scoped_session(sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine))
+_request_state = threading.local()
+
+@contextmanager
+def request_scope():
+    """
+    Share one session across everything done during a request (a Streamlit rerun)
+
+    ORM objects returned by the query functions can lazy-load relationships until
+    the scope ends; the session is closed and its connection returned to the pool
+    when the outermost scope exits.
+    """
+    _request_state.depth = getattr(_request_state, 'depth', 0) + 1
+    try:
+        yield Session()
+    finally:
+        _request_state.depth -= 1
+        if _request_state.depth == 0:
+            Session.remove()
+
+@contextmanager
+def session_scope():
+    """
+    Unit of work: commit on success, roll back on error
+
+    Inside a request_scope the request's session is reused; otherwise the
+    session is closed on exit. Nested scopes join the outermost one, which
+    alone commits or rolls back.
+    """
+    session = Session()
+    outermost = not getattr(_request_state, 'units', 0)
+    _request_state.units = getattr(_request_state, 'units', 0) + 1
+    try:
+        yield session
+        if outermost:
+            session.commit()
+    except Exception:
+        if outermost:
+            session.rollback()
+        raise
+    finally:
+        _request_state.units -= 1
+        if outermost and not getattr(_request_state, 'depth', 0):
+            Session.remove()
 
 def init_database():
     """Initialize the database, creating tables if they don't exist"""
@@ -44,129 +173,120 @@ def init_database():
     # Populate ETF data if not already present
     populate_etf_data()
 
-def get_db_session():
-    """Get a database session"""
-    db = SessionLocal()
-    try:
-        return db
-    finally:
-        db.close()
-
 def populate_etf_data():
     """Populate the ETF table with data if it's empty"""
-    db = get_db_session()
-
-    # Check if ETF table is empty
-    etf_count = db.query(ETF).count()
-    if etf_count > 0:
-        return
-
-    # Add tech ETFs
-    tech_etfs = get_tech_etfs()
-    for etf_data in tech_etfs:
-        etf = ETF(
-            symbol=etf_data['symbol'],
-            name=etf_data['name'],
-            category='Tech ETFs',
-            expense_ratio=etf_data['expense_ratio']
-        )
-        db.add(etf)
-
-    # Add complementary ETFs
-    complementary_etfs = get_complementary_etfs()
-    for etf_data in complementary_etfs:
-        etf = ETF(
-            symbol=etf_data['symbol'],
-            name=etf_data['name'],
-            category='Complementary ETFs',
-            sector=etf_data.get('sector', ''),
-            expense_ratio=etf_data['expense_ratio']
-        )
-        db.add(etf)
-
-    db.commit()
+    with session_scope() as db:
+        # Check if ETF table is empty
+        etf_count = db.query(ETF).count()
+        if etf_count > 0:
+            return
+
+        # Add tech ETFs
+        tech_etfs = get_tech_etfs()
+        for etf_data in tech_etfs:
+            etf = ETF(
+                symbol=etf_data['symbol'],
+                name=etf_data['name'],
+                category='Tech ETFs',
+                expense_ratio=etf_data['expense_ratio']
+            )
+            db.add(etf)
+
+        # Add complementary ETFs
+        complementary_etfs = get_complementary_etfs()
+        for etf_data in complementary_etfs:
+            etf = ETF(
+                symbol=etf_data['symbol'],
+                name=etf_data['name'],
+                category='Complementary ETFs',
+                sector=etf_data.get('sector', ''),
+                expense_ratio=etf_data['expense_ratio']
+            )
+            db.add(etf)
+
+def _set_etf_associations(db, user_id, tech_etfs, complementary_etfs, tech_allocation, complementary_allocation):
+    """
+    Replace a user's ETF associations with equal allocations within each sleeve
+
+    Costs one IN lookup for every symbol, one delete per association table
+    and one executemany insert per table, whatever the number of ETFs.
+    Symbols missing from the ETF table are skipped.
+    """
+    etf_ids = dict(db.execute(
+        select(ETF.symbol, ETF.id).where(ETF.symbol.in_(list(tech_etfs) + list(complementary_etfs)))
+    ).all())
+
+    for table, symbols, allocation in ((user_tech_etfs, tech_etfs, tech_allocation),
+                                       (user_complementary_etfs, complementary_etfs, complementary_allocation)):
+        db.execute(delete(table).where(table.c.user_id == user_id))
+
+        rows = [
+            {'user_id': user_id, 'etf_id': etf_ids[symbol], 'allocation_percentage': allocation / len(symbols)}
+            for symbol in symbols if symbol in etf_ids
+        ]
+        if rows:
+            db.execute(table.insert(), rows)
 
 def create_user(first_name, last_name, initial_investment, monthly_contribution, 
                 tech_allocation, complementary_allocation, investment_duration, 
                 risk_tolerance, tech_etfs, complementary_etfs):
     """Create a new user with portfolio settings"""
-    db = get_db_session()
-
-    # Convert ETF lists to comma-separated strings for backward compatibility
-    tech_etfs_str = ','.join(tech_etfs) if tech_etfs else ''
-    complementary_etfs_str = ','.join(complementary_etfs) if complementary_etfs else ''
-
-    user = User(
-        first_name=first_name,
-        last_name=last_name,
-        initial_investment=initial_investment,
-        monthly_contribution=monthly_contribution,
-        tech_allocation=tech_allocation,
-        complementary_allocation=complementary_allocation,
-        investment_duration=investment_duration,
-        risk_tolerance=risk_tolerance,
-        tech_etfs=tech_etfs_str,
-        complementary_etfs=complementary_etfs_str
-    )
+    with session_scope() as db:
+        # Convert ETF lists to comma-separated strings for backward compatibility
+        tech_etfs_str = ','.join(tech_etfs) if tech_etfs else ''
+        complementary_etfs_str = ','.join(complementary_etfs) if complementary_etfs else ''
+
+        user = User(
+            first_name=first_name,
+            last_name=last_name,
+            initial_investment=initial_investment,
+            monthly_contribution=monthly_contribution,
+            tech_allocation=tech_allocation,
+            complementary_allocation=complementary_allocation,
+            investment_duration=investment_duration,
+            risk_tolerance=risk_tolerance,
+            tech_etfs=tech_etfs_str,
+            complementary_etfs=complementary_etfs_str
+        )
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    # Associate ETFs with user using the relationship tables
-    # First get tech ETFs
-    if tech_etfs:
-        tech_etf_count = len(tech_etfs)
-        individual_allocation = tech_allocation / tech_etf_count
-
-        for symbol in tech_etfs:
-            etf = db.query(ETF).filter(ETF.symbol == symbol).first()
-            if etf:
-                statement = user_tech_etfs.insert().values(
-                    user_id=user.id, 
-                    etf_id=etf.id, 
-                    allocation_percentage=individual_allocation
-                )
-                db.execute(statement)
-
-    # Then complementary ETFs
-    if complementary_etfs:
-        comp_etf_count = len(complementary_etfs)
-        individual_allocation = complementary_allocation / comp_etf_count
-
-        for symbol in complementary_etfs:
-            etf = db.query(ETF).filter(ETF.symbol == symbol).first()
-            if etf:
-                statement = user_complementary_etfs.insert().values(
-                    user_id=user.id, 
-                    etf_id=etf.id, 
-                    allocation_percentage=individual_allocation
-                )
-                db.execute(statement)
-
-    db.commit()
-
-    # Create initial portfolio snapshot
-    create_portfolio_snapshot(user.id)
+        db.add(user)
+        db.flush()
+
+        # Associate ETFs with user using the relationship tables
+        _set_etf_associations(db, user.id, tech_etfs or [], complementary_etfs or [],
+                              tech_allocation, complementary_allocation)
+
+        # Buy the initial holdings at the latest prices
+        _rebalance_holdings(db, user, initial_investment, 'initial')
+
+        # Create initial portfolio snapshot in the same transaction
+        _write_portfolio_snapshot(db, user)
 
     return user.id
 
 def get_user_by_id(user_id):
     """Get a user by ID"""
-    db = get_db_session()
-    return db.query(User).filter(User.id == user_id).first()
+    with session_scope() as db:
+        return db.query(User).filter(User.id == user_id).first()
 
 def update_user_portfolio(user_id, initial_investment, monthly_contribution, 
                           tech_allocation, complementary_allocation, investment_duration, 
                           risk_tolerance, tech_etfs, complementary_etfs):
     """Update a user's portfolio settings"""
-    db = get_db_session()
-    user = db.query(User).filter(User.id == user_id).first()
+    with session_scope() as db:
+        user = db.query(User).filter(User.id == user_id).first()
+
+        if not user:
+            return False
+
+        # Drop the cached projection for the old inputs
+        from services.projection_service import invalidate_projection_cache
+        invalidate_projection_cache(user.id)
 
-    if user:
         # Convert ETF lists to comma-separated strings for backward compatibility
         tech_etfs_str = ','.join(tech_etfs) if tech_etfs else ''
         complementary_etfs_str = ','.join(complementary_etfs) if complementary_etfs else ''
+        investment_change = initial_investment - user.initial_investment
 
         user.initial_investment = initial_investment
         user.monthly_contribution = monthly_contribution
@@ -177,69 +297,51 @@ def update_user_portfolio(user_id, initial_investment, monthly_contribution,
         user.tech_etfs = tech_etfs_str
         user.complementary_etfs = complementary_etfs_str
 
-        # Remove old ETF associations
-        # For tech ETFs
-        from sqlalchemy import text
-        db.execute(text(f"DELETE FROM user_tech_etfs WHERE user_id = {user.id}"))
-
-        # For complementary ETFs
-        db.execute(text(f"DELETE FROM user_complementary_etfs WHERE user_id = {user.id}"))
-
-        # Add new ETF associations
-        # First tech ETFs
-        if tech_etfs:
-            tech_etf_count = len(tech_etfs)
-            individual_allocation = tech_allocation / tech_etf_count
-
-            for symbol in tech_etfs:
-                etf = db.query(ETF).filter(ETF.symbol == symbol).first()
-                if etf:
-                    statement = user_tech_etfs.insert().values(
-                        user_id=user.id, 
-                        etf_id=etf.id, 
-                        allocation_percentage=individual_allocation
-                    )
-                    db.execute(statement)
-
-        # Then complementary ETFs
-        if complementary_etfs:
-            comp_etf_count = len(complementary_etfs)
-            individual_allocation = complementary_allocation / comp_etf_count
-
-            for symbol in complementary_etfs:
-                etf = db.query(ETF).filter(ETF.symbol == symbol).first()
-                if etf:
-                    statement = user_complementary_etfs.insert().values(
-                        user_id=user.id, 
-                        etf_id=etf.id, 
-                        allocation_percentage=individual_allocation
-                    )
-                    db.execute(statement)
-
-        db.commit()
-
-        # Create new portfolio snapshot
-        create_portfolio_snapshot(user.id)
-
-        return True
-
-    return False
+        # Replace the ETF associations
+        _set_etf_associations(db, user.id, tech_etfs or [], complementary_etfs or [],
+                              tech_allocation, complementary_allocation)
+
+        # Move the holdings to the new allocation, adding or withdrawing any change
+        # in the initial investment; portfolios without holdings buy them now
+        if db.query(Holding).filter(Holding.user_id == user.id).count():
+            _rebalance_holdings(db, user, investment_change, 'rebalance')
+        else:
+            _rebalance_holdings(db, user, initial_investment, 'initial')
+
+        # Create new portfolio snapshot in the same transaction
+        _write_portfolio_snapshot(db, user)
+
+    return True
 
 def create_portfolio_snapshot(user_id):
     """Create a snapshot of the user's portfolio"""
+    with session_scope() as db:
+        user = db.query(User).filter(User.id == user_id).first()
+
+        if not user:
+            return None
+
+        return _write_portfolio_snapshot(db, user)
+
+def _write_portfolio_snapshot(db, user):
+    """
+    Add a snapshot of the user's portfolio and its ETFs to the session
+
+    Pending holding changes are flushed first so the snapshot values them;
+    the ETF rows are inserted with one executemany.
+    """
     from services.portfolio_service import calculate_etf_allocations, get_portfolio_value
     from services.projection_service import calculate_alpha
+    from services.valuation_service import get_holding_values
 
-    db = get_db_session()
-    user = db.query(User).filter(User.id == user_id).first()
-
-    if not user:
-        return None
+    db.flush()
 
-    # Get portfolio data
-    portfolio_value = get_portfolio_value(user)
+    # Get portfolio data, looking the holdings up once
+    holding_values = get_holding_values(user)
+    portfolio_value = get_portfolio_value(user, holding_values)
     alpha_data = calculate_alpha(user)
-    etf_allocations = calculate_etf_allocations(user)
+    etf_allocations = calculate_etf_allocations(user, holding_values)
+    returns = get_etf_returns([etf['symbol'] for etf in etf_allocations])
 
     # Create portfolio snapshot
     # Convert NumPy float64 to Python float
@@ -254,53 +356,199 @@ def create_portfolio_snapshot(user_id):
     )
 
     db.add(snapshot)
-    db.commit()
-    db.refresh(snapshot)
-
-    # Create ETF snapshots
-    for etf in etf_allocations:
-        symbol = etf['symbol']
-        returns = get_etf_return(symbol)
-
-        etf_snapshot = ETFSnapshot(
-            portfolio_snapshot_id=snapshot.id,
-            etf_symbol=symbol,
-            etf_name=etf.get('name', symbol),
-            allocation_percentage=etf['allocation'],
-            value=etf['value'],
-            return_1y=returns['1y'],
-            return_3y=returns['3y'],
-            return_5y=returns['5y']
-        )
-
-        db.add(etf_snapshot)
-
-    db.commit()
+    db.flush()
+
+    # Create ETF snapshots in one executemany
+    if etf_allocations:
+        db.execute(insert(ETFSnapshot), [
+            {
+                'portfolio_snapshot_id': snapshot.id,
+                'etf_symbol': etf['symbol'],
+                'etf_name': etf.get('name', etf['symbol']),
+                'allocation_percentage': etf['allocation'],
+                'value': etf['value'],
+                'return_1y': float(etf_returns[0]),
+                'return_3y': float(etf_returns[1]),
+                'return_5y': float(etf_returns[2])
+            }
+            for etf, etf_returns in zip(etf_allocations, returns)
+        ])
 
     return snapshot
 
 def get_latest_portfolio_snapshot(user_id):
     """Get the latest portfolio snapshot for a user"""
-    db = get_db_session()
+    with session_scope() as db:
+        snapshot = db.query(PortfolioSnapshot)\
+            .options(selectinload(PortfolioSnapshot.etf_snapshots))\
+            .filter(PortfolioSnapshot.user_id == user_id)\
+            .order_by(PortfolioSnapshot.snapshot_date.desc())\
+            .first()
 
-    snapshot = db.query(PortfolioSnapshot)\
-        .filter(PortfolioSnapshot.user_id == user_id)\
-        .order_by(PortfolioSnapshot.snapshot_date.desc())\
-        .first()
-
-    return snapshot
+        return snapshot
 
 def get_portfolio_snapshot_history(user_id, limit=10):
     """Get historical portfolio snapshots for a user"""
-    db = get_db_session()
-
-    snapshots = db.query(PortfolioSnapshot)\
-        .filter(PortfolioSnapshot.user_id == user_id)\
-        .order_by(PortfolioSnapshot.snapshot_date.desc())\
-        .limit(limit)\
-        .all()
-
-    return snapshots
+    with session_scope() as db:
+        snapshots = db.query(PortfolioSnapshot)\
+            .filter(PortfolioSnapshot.user_id == user_id)\
+            .order_by(PortfolioSnapshot.snapshot_date.desc())\
+            .limit(limit)\
+            .all()
+
+        return snapshots
+
+def get_etf_price_history(symbol, start_date, end_date):
+    """Get ingested daily closes for an ETF between two dates (inclusive)"""
+    statement = select(ETFPrice.date, ETFPrice.close)\
+        .where(ETFPrice.symbol == symbol, ETFPrice.date.between(start_date, end_date))\
+        .order_by(ETFPrice.date)
+
+    with engine.connect() as connection:
+        rows = connection.execute(statement).all()
+
+    return pd.DataFrame(rows, columns=['date', 'close'])
+
+def get_latest_etf_prices(symbols, as_of):
+    """Get {symbol: close} for the last ingested close on or before as_of, for the symbols that have one"""
+    latest = select(ETFPrice.symbol, func.max(ETFPrice.date).label('date'))\
+        .where(ETFPrice.symbol.in_(list(symbols)), ETFPrice.date <= as_of)\
+        .group_by(ETFPrice.symbol)\
+        .subquery()
+    statement = select(ETFPrice.symbol, ETFPrice.close)\
+        .join(latest, (ETFPrice.symbol == latest.c.symbol) & (ETFPrice.date == latest.c.date))
+
+    with engine.connect() as connection:
+        rows = connection.execute(statement).all()
+
+    return {symbol: close for symbol, close in rows}
+
+def get_user_holdings(user_id):
+    """Get a user's holdings as a DataFrame with symbol and units columns"""
+    statement = select(Holding.etf_symbol, Holding.units)\
+        .where(Holding.user_id == user_id)\
+        .order_by(Holding.id)
+
+    # Read through the session so holdings written earlier in the unit of work are visible
+    with session_scope() as db:
+        rows = db.execute(statement).all()
+
+    return pd.DataFrame(rows, columns=['symbol', 'units'])
+
+def get_holdings_by_user():
+    """
+    Get every user's holdings in one query
+
+    Returns:
+        DataFrame with user_id, initial_investment, monthly_contribution, symbol and
+        units columns; users without holdings have a single row with null symbol and units
+    """
+    statement = select(User.id, User.initial_investment, User.monthly_contribution, Holding.etf_symbol, Holding.units)\
+        .outerjoin(Holding, Holding.user_id == User.id)\
+        .order_by(User.id)
+
+    with engine.connect() as connection:
+        rows = connection.execute(statement).all()
+
+    return pd.DataFrame(rows, columns=['user_id', 'initial_investment', 'monthly_contribution', 'symbol', 'units'])
+
+def get_etf_allocation_entries():
+    """
+    Get every user's per-ETF allocation from the association tables in one query
+
+    Returns:
+        DataFrame with user_id, symbol and allocation columns, one row per association
+    """
+    statement = union_all(*[
+        select(table.c.user_id, ETF.symbol, table.c.allocation_percentage)
+        .join(ETF, ETF.id == table.c.etf_id)
+        for table in (user_tech_etfs, user_complementary_etfs)
+    ])
+
+    with engine.connect() as connection:
+        rows = connection.execute(statement).all()
+
+    return pd.DataFrame(rows, columns=['user_id', 'symbol', 'allocation'])
+
+def _rebalance_holdings(db, user, amount, transaction_type):
+    """
+    Trade a user's holdings towards their target weights at the latest prices
+
+    'contribution' only buys with the amount at the target weights; 'initial'
+    and 'rebalance' bring the whole portfolio (current value plus amount) to
+    the target weights. Every trade is recorded as a HoldingTransaction and
+    the caller commits; inserts are batched, updates and deletes go out
+    with the next flush.
+    """
+    from services.portfolio_service import get_target_weights
+    from services.valuation_service import get_latest_prices
+
+    target_symbols, target_weights = get_target_weights(user)
+    holdings = {holding.etf_symbol: holding for holding in db.query(Holding).filter(Holding.user_id == user.id)}
+    symbols = target_symbols + [symbol for symbol in holdings if symbol not in target_symbols]
+    prices = get_latest_prices(symbols)
+    priced = np.isfinite(prices) & (prices > 0)
+
+    weights = np.zeros(len(symbols))
+    weights[:len(target_weights)] = target_weights
+    weights[~priced] = 0.0
+    if weights.sum() <= 0:
+        return
+    weights /= weights.sum()
+
+    current_units = np.array([holdings[symbol].units if symbol in holdings else 0.0 for symbol in symbols])
+    safe_prices = np.where(priced, prices, 1.0)
+    if transaction_type == 'contribution':
+        trades = np.where(priced, amount * weights / safe_prices, 0.0)
+    else:
+        total = float(np.where(priced, current_units * safe_prices, 0.0).sum()) + amount
+        trades = np.where(priced, max(total, 0.0) * weights / safe_prices - current_units, 0.0)
+
+    transaction_date = datetime.now()
+    transactions = []
+    new_holdings = []
+    for symbol, units, price, trade in zip(symbols, current_units, prices, trades):
+        if abs(trade) < 1e-12:
+            continue
+
+        transactions.append({
+            'user_id': user.id,
+            'transaction_date': transaction_date,
+            'transaction_type': transaction_type,
+            'etf_symbol': symbol,
+            'units': float(trade),
+            'price': float(price),
+            'amount': float(trade * price)
+        })
+
+        new_units = float(units + trade)
+        if symbol in holdings:
+            if new_units <= 1e-12:
+                db.delete(holdings[symbol])
+            else:
+                holdings[symbol].units = new_units
+        else:
+            new_holdings.append({'user_id': user.id, 'etf_symbol': symbol, 'units': new_units})
+
+    # New rows go out as one executemany per table
+    if new_holdings:
+        db.execute(insert(Holding), new_holdings)
+    if transactions:
+        db.execute(insert(HoldingTransaction), transactions)
+
+def record_contribution(user_id, amount=None):
+    """Buy a contribution (defaults to the monthly contribution) at the user's target weights"""
+    with session_scope() as db:
+        user = db.query(User).filter(User.id == user_id).first()
+
+        if not user:
+            return False
+
+        if amount is None:
+            amount = user.monthly_contribution
+        _rebalance_holdings(db, user, float(amount), 'contribution')
+
+    return True
 
 # Import these at the end to avoid circular imports
 from database.models import user_tech_etfs, user_complementary_etfs
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Table, PrimaryKeyConstraint, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -65,6 +65,8 @@ class User(Base):
     tech_etfs_relationship = relationship("ETF", secondary=user_tech_etfs, back_populates="tech_portfolios")
     complementary_etfs_relationship = relationship("ETF", secondary=user_complementary_etfs, back_populates="complementary_portfolios")
     portfolio_snapshots = relationship("PortfolioSnapshot", back_populates="user", cascade="all, delete-orphan")
+    holdings = relationship("Holding", back_populates="user", cascade="all, delete-orphan")
+    holding_transactions = relationship("HoldingTransaction", back_populates="user", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<User(id={self.id}, first_name='{self.first_name}', last_name='{self.last_name}')>"
@@ -104,3 +106,55 @@ class ETFSnapshot(Base):
     
     def __repr__(self):
         return f"<ETFSnapshot(id={self.id}, etf_symbol='{self.etf_symbol}', allocation={self.allocation_percentage}, value={self.value})>"
+
+class ETFPrice(Base):
+    __tablename__ = 'etf_prices'
+    
+    symbol = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    close = Column(Float, nullable=False)
+    
+    # The composite key doubles as the (symbol, date) index used for range queries
+    __table_args__ = (
+        PrimaryKeyConstraint('symbol', 'date', name='pk_etf_prices'),
+    )
+    
+    def __repr__(self):
+        return f"<ETFPrice(symbol='{self.symbol}', date='{self.date}', close={self.close})>"
+
+class Holding(Base):
+    __tablename__ = 'holdings'
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    etf_symbol = Column(String, nullable=False)
+    units = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'etf_symbol', name='uq_holdings_user_symbol'),
+    )
+    
+    # Relationships
+    user = relationship("User", back_populates="holdings")
+    
+    def __repr__(self):
+        return f"<Holding(user_id={self.user_id}, etf_symbol='{self.etf_symbol}', units={self.units})>"
+
+class HoldingTransaction(Base):
+    __tablename__ = 'holding_transactions'
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    transaction_date = Column(DateTime, default=func.now())
+    transaction_type = Column(String, nullable=False)  # initial, contribution or rebalance
+    etf_symbol = Column(String, nullable=False)
+    units = Column(Float, nullable=False)  # Negative for sales
+    price = Column(Float, nullable=False)
+    amount = Column(Float, nullable=False)  # units * price
+    
+    # Relationships
+    user = relationship("User", back_populates="holding_transactions")
+    
+    def __repr__(self):
+        return f"<HoldingTransaction(user_id={self.user_id}, type='{self.transaction_type}', etf_symbol='{self.etf_symbol}', units={self.units})>"
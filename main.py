@@ -7,7 +7,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from components.setup_page import show_setup_page
 from components.dashboard_page import show_dashboard_page
-from database.db_service import init_database
+from database.db_service import init_database, request_scope
 from utils.constants import PAGES
 import config
 
@@ -47,11 +47,13 @@ def main():
     # Show header
     show_header()
     
-    # Display the appropriate page based on the session state
-    if st.session_state.page == PAGES["SETUP"]:
-        show_setup_page()
-    elif st.session_state.page == PAGES["DASHBOARD"]:
-        show_dashboard_page()
+    # Display the appropriate page based on the session state, sharing one
+    # database session for the whole rerun
+    with request_scope():
+        if st.session_state.page == PAGES["SETUP"]:
+            show_setup_page()
+        elif st.session_state.page == PAGES["DASHBOARD"]:
+            show_dashboard_page()
 
 if __name__ == "__main__":
     main()
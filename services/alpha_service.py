@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from services.etf_service import get_etf_historical_data, SP500_SYMBOL
+from services.portfolio_service import calculate_etf_allocations
+import config
+
+# Tracking errors below this are floating-point noise around a deterministic path
+TRACKING_ERROR_TOLERANCE = 1e-12
+
+def compute_alpha_metrics(portfolio_values, benchmark_values, periods_per_year=1, target=None):
+    """
+    Compute alpha and benchmark-relative analytics from value series in one pass
+
+    Both inputs are arrays of shape (periods,) or (portfolios, periods); NaN
+    padding after the end of a series (e.g. a shorter duration) is ignored.
+
+    Args:
+        portfolio_values: Portfolio values per period
+        benchmark_values: Benchmark values per period, same shape
+        periods_per_year: Periods per year, used to annualize (1 yearly, 12 monthly)
+        target: Annual outperformance target (defaults to config.ALPHA_TARGET)
+
+    Returns:
+        Dictionary of arrays with a leading portfolios axis:
+        'alpha' and 'alpha_cumulative' (portfolios, periods) with 0 for the first period,
+        'active_return', 'tracking_error' and 'information_ratio' (annualized) and
+        'target_hit_rate' (share of periods whose alpha met the target) per portfolio;
+        the information ratio is NaN where the tracking error is zero
+    """
+    if target is None:
+        target = config.ALPHA_TARGET
+
+    portfolio_values = np.atleast_2d(np.asarray(portfolio_values, dtype=np.float64))
+    benchmark_values = np.atleast_2d(np.asarray(benchmark_values, dtype=np.float64))
+
+    # Period alpha is the difference of the period-on-period value ratios
+    alpha = np.zeros(portfolio_values.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha[:, 1:] = (
+            portfolio_values[:, 1:] / portfolio_values[:, :-1]
+            - benchmark_values[:, 1:] / benchmark_values[:, :-1]
+        )
+    alpha[np.isnan(portfolio_values) | np.isnan(benchmark_values)] = np.nan
+
+    # Statistics over the periods that have a return
+    active = alpha[:, 1:]
+    valid = ~np.isnan(active)
+    periods = valid.sum(axis=1)
+    active_filled = np.where(valid, active, 0.0)
+    mean = active_filled.sum(axis=1) / np.maximum(periods, 1)
+    squares = np.where(valid, active - mean[:, np.newaxis], 0.0) ** 2
+    deviation = np.sqrt(squares.sum(axis=1) / np.maximum(periods - 1, 1))
+    hits = (valid & (active_filled >= target / periods_per_year)).sum(axis=1)
+
+    active_return = mean * periods_per_year
+    tracking_error = deviation * np.sqrt(periods_per_year)
+    tracking_error[tracking_error < TRACKING_ERROR_TOLERANCE] = 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        information_ratio = np.where(tracking_error > 0, active_return / tracking_error, np.nan)
+
+    return {
+        'alpha': alpha,
+        'alpha_cumulative': np.cumsum(alpha, axis=1),
+        'active_return': active_return,
+        'tracking_error': tracking_error,
+        'information_ratio': information_ratio,
+        'target_hit_rate': np.where(periods > 0, hits / np.maximum(periods, 1), np.nan)
+    }
+
+def alpha_frame(periods, metrics, row=0):
+    """Build the per-period alpha DataFrame for one portfolio of compute_alpha_metrics output"""
+    return pd.DataFrame({
+        'year': periods,
+        'alpha_yearly': metrics['alpha'][row],
+        'alpha_cumulative': metrics['alpha_cumulative'][row]
+    })
+
+def alpha_summary(metrics, row=0):
+    """Get the scalar analytics for one portfolio of compute_alpha_metrics output"""
+    cumulative = metrics['alpha_cumulative'][row]
+    cumulative = cumulative[~np.isnan(cumulative)]
+    return {
+        'final_alpha': float(cumulative[-1]) if len(cumulative) else 0.0,
+        'active_return': float(metrics['active_return'][row]),
+        'tracking_error': float(metrics['tracking_error'][row]),
+        'information_ratio': float(metrics['information_ratio'][row]),
+        'target_hit_rate': float(metrics['target_hit_rate'][row])
+    }
+
+def get_projected_alpha_metrics(users):
+    """
+    Get projected alpha analytics for many portfolios in one vectorized call
+
+    Returns:
+        DataFrame with one row per user and the alpha_summary columns
+    """
+    from services.projection_service import project_portfolio_values
+
+    users = list(users)
+    columns = ['user_id', 'final_alpha', 'active_return', 'tracking_error', 'information_ratio', 'target_hit_rate']
+    if not users:
+        return pd.DataFrame(columns=columns)
+
+    values = project_portfolio_values(
+        [float(user.initial_investment) for user in users],
+        [float(user.monthly_contribution) for user in users],
+        [user.tech_allocation for user in users],
+        [user.complementary_allocation for user in users],
+        [user.investment_duration for user in users],
+        [user.risk_tolerance for user in users]
+    )
+    metrics = compute_alpha_metrics(values['portfolio_value'], values['sp500_benchmark'])
+
+    rows = [{'user_id': user.id, **alpha_summary(metrics, row)} for row, user in enumerate(users)]
+    return pd.DataFrame(rows, columns=columns)
+
+def get_historical_portfolio_values(user, years=5, as_of=None):
+    """
+    Get monthly historical values of a user's portfolio and the S&P 500, both rebased to 1
+
+    The portfolio is rebalanced to its ETF allocations every month.
+
+    Returns:
+        DataFrame with date, portfolio_value and sp500_benchmark columns, or None without ETFs
+    """
+    allocations = calculate_etf_allocations(user)
+    if not allocations:
+        return None
+
+    histories = [get_etf_historical_data(etf['symbol'], years, as_of) for etf in allocations]
+    benchmark = get_etf_historical_data(SP500_SYMBOL, years, as_of)
+
+    # Align on the most recent months every series has
+    length = min(len(history) for history in histories + [benchmark])
+    if length < 2:
+        return None
+    prices = np.column_stack([history['value'].to_numpy()[-length:] for history in histories])
+    weights = np.array([etf['allocation'] for etf in allocations], dtype=np.float64)
+    weights = weights / weights.sum()
+
+    # Monthly portfolio return is the weighted ETF return, compounded into a value series
+    returns = prices[1:] / prices[:-1] - 1
+    portfolio_value = np.concatenate(([1.0], np.cumprod(1 + returns @ weights)))
+    benchmark_prices = benchmark['value'].to_numpy()[-length:]
+
+    return pd.DataFrame({
+        'date': benchmark['date'].to_numpy()[-length:],
+        'portfolio_value': portfolio_value,
+        'sp500_benchmark': benchmark_prices / benchmark_prices[0]
+    })
+
+def calculate_historical_alpha(user, years=5, as_of=None):
+    """
+    Calculate alpha analytics of a user's portfolio against the S&P 500 over past months
+
+    Returns:
+        Tuple of (DataFrame with date, alpha_monthly and alpha_cumulative columns,
+        alpha_summary dictionary with annualized figures), or (None, None) without ETFs
+    """
+    history = get_historical_portfolio_values(user, years, as_of)
+    if history is None:
+        return None, None
+
+    metrics = compute_alpha_metrics(history['portfolio_value'], history['sp500_benchmark'], periods_per_year=12)
+    alpha_data = pd.DataFrame({
+        'date': history['date'],
+        'alpha_monthly': metrics['alpha'][0],
+        'alpha_cumulative': metrics['alpha_cumulative'][0]
+    })
+
+    return alpha_data, alpha_summary(metrics)
@@ -0,0 +1,193 @@
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import pandas as pd
+from data.etf_data import DAYS_PER_YEAR
+from services.etf_service import get_etf_catalog, get_price_store
+from services.portfolio_service import calculate_etf_allocations
+
+# Supported rebalance schedules and the period that starts a new rebalance window
+REBALANCE_SCHEDULES = {
+    'monthly': 'M',
+    'quarterly': 'Q',
+    'annually': 'Y',
+    'never': None
+}
+
+class BacktestResult:
+    """Equity curve, rebalance log and turnover of a backtest"""
+
+    __slots__ = ('equity', 'rebalances', 'turnover', 'total_contributions')
+
+    def __init__(self, equity, rebalances, turnover, total_contributions):
+        self.equity = equity
+        self.rebalances = rebalances
+        self.turnover = turnover
+        self.total_contributions = total_contributions
+
+    @property
+    def final_value(self):
+        return float(self.equity['portfolio_value'].iloc[-1])
+
+def _period_starts(dates, period):
+    """Flag the first stored day of every period (the first day itself is not flagged)"""
+    periods = dates.to_period(period)
+    starts = np.zeros(len(dates), dtype=bool)
+    starts[1:] = periods[1:] != periods[:-1]
+    return starts
+
+def run_backtest(symbols, weights, initial_investment, monthly_contribution=0.0, years=5, as_of=None,
+                 schedule='quarterly', drift_threshold=None, expense_ratios=None):
+    """
+    Backtest holding a basket of ETFs with contributions and rebalancing
+
+    Values between events are one (days x symbols) product with the units held,
+    so the only Python loop is over contribution and rebalance events.
+    Contributions buy at the target weights on the first day of each month.
+
+    Args:
+        symbols: ETF symbols held
+        weights: Target weight per symbol (normalized to sum to 1)
+        initial_investment: Amount invested on the first day
+        monthly_contribution: Amount added on the first day of each later month
+        years: Length of the backtest
+        as_of: Last day of the backtest (defaults to today)
+        schedule: One of REBALANCE_SCHEDULES
+        drift_threshold: Also rebalance on any day a weight drifts further than this from its target
+        expense_ratios: Annual expense ratio per symbol, deducted as a daily decay
+
+    Returns:
+        BacktestResult
+
+    Raises:
+        ValueError: For an unknown schedule or a window without stored prices
+    """
+    if schedule not in REBALANCE_SCHEDULES:
+        raise ValueError(f"Unknown rebalance schedule {schedule}; expected one of {list(REBALANCE_SCHEDULES)}")
+    if as_of is None:
+        as_of = date.today()
+
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    expense_ratios = np.zeros(len(symbols)) if expense_ratios is None else np.asarray(expense_ratios, dtype=np.float64)
+
+    end_date = datetime.combine(as_of, time())
+    start_date = end_date - timedelta(days=years * 365)
+    dates, prices = get_price_store(as_of).read(list(symbols), start_date, end_date)
+    if not len(dates):
+        raise ValueError(
+            f"No stored prices between {start_date:%Y-%m-%d} and {end_date:%Y-%m-%d}; "
+            "as_of must fall within the price store"
+        )
+
+    # Prices net of fees: every day held costs 1/365 of the annual expense ratio
+    elapsed = (dates - dates[0]).days.to_numpy()[:, np.newaxis]
+    prices = prices * (1 - expense_ratios) ** (elapsed / DAYS_PER_YEAR)
+
+    # Event calendar
+    contribution_days = _period_starts(dates, 'M') if monthly_contribution else np.zeros(len(dates), dtype=bool)
+    period = REBALANCE_SCHEDULES[schedule]
+    scheduled_days = _period_starts(dates, period) if period else np.zeros(len(dates), dtype=bool)
+    events = np.flatnonzero(contribution_days | scheduled_days)
+
+    values = np.empty(len(dates))
+    invested = np.empty(len(dates))
+    units = initial_investment * weights / prices[0]
+    total_invested = float(initial_investment)
+    rebalances = []
+
+    day = 0
+    next_event = 0
+    while day < len(dates):
+        end = events[next_event] if next_event < len(events) else len(dates)
+        segment = prices[day:end]
+        reason = 'schedule'
+
+        # Cut the segment short at the first day the weights drift out of bounds
+        if drift_threshold is not None and len(segment) > 1:
+            holdings = segment[1:] * units
+            drift = np.abs(holdings / holdings.sum(axis=1, keepdims=True) - weights).max(axis=1)
+            breached = np.flatnonzero(drift > drift_threshold)
+            if len(breached):
+                end = day + 1 + breached[0]
+                segment = prices[day:end]
+                reason = 'drift'
+
+        values[day:end] = segment @ units
+        invested[day:end] = total_invested
+        if end >= len(dates):
+            break
+
+        # Apply the event at the end of the segment
+        at_event = next_event < len(events) and end == events[next_event]
+        if at_event:
+            next_event += 1
+        cash = monthly_contribution if at_event and contribution_days[end] else 0.0
+        is_rebalance = reason == 'drift' or (at_event and scheduled_days[end])
+
+        holdings = units * prices[end]
+        value = holdings.sum()
+        if not is_rebalance and drift_threshold is not None:
+            # A contribution day also rebalances if the weights are already out of bounds
+            if np.abs(holdings / value - weights).max() > drift_threshold:
+                is_rebalance = True
+                reason = 'drift'
+
+        if is_rebalance:
+            new_units = (value + cash) * weights / prices[end]
+            sold = float(np.clip(holdings - new_units * prices[end], 0, None).sum())
+            rebalances.append({
+                'date': dates[end],
+                'reason': reason,
+                'portfolio_value': value + cash,
+                'traded_value': sold,
+                'turnover': sold / value if value else 0.0
+            })
+            units = new_units
+        else:
+            units = units + cash * weights / prices[end]
+        total_invested += cash
+        day = end
+
+    equity = pd.DataFrame({
+        'date': dates,
+        'portfolio_value': values,
+        'initial_plus_contributions': invested
+    })
+    rebalances = pd.DataFrame(rebalances, columns=['date', 'reason', 'portfolio_value', 'traded_value', 'turnover'])
+
+    # Annualized one-way turnover: value sold over the average portfolio value
+    span_years = max(len(dates) - 1, 1) / DAYS_PER_YEAR
+    turnover = float(rebalances['traded_value'].sum() / values.mean() / span_years) if len(rebalances) else 0.0
+
+    return BacktestResult(equity, rebalances, turnover, total_invested)
+
+def backtest_portfolio(user, years=5, as_of=None, schedule='quarterly', drift_threshold=None):
+    """
+    Backtest a user's ETF basket with their monthly contributions
+
+    Returns:
+        BacktestResult, or None if the user has no ETFs
+
+    Raises:
+        ValueError: If the price store has no prices for the window
+    """
+    allocations = calculate_etf_allocations(user)
+    if not allocations:
+        return None
+
+    catalog = get_etf_catalog()
+    symbols = [etf['symbol'] for etf in allocations]
+    weights = [etf['allocation'] for etf in allocations]
+    expense_ratios = [catalog.get(symbol).expense_ratio if catalog.get(symbol) else 0.0 for symbol in symbols]
+
+    return run_backtest(
+        symbols,
+        weights,
+        float(user.initial_investment),
+        float(user.monthly_contribution),
+        years=years,
+        as_of=as_of,
+        schedule=schedule,
+        drift_threshold=drift_threshold,
+        expense_ratios=expense_ratios
+    )
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from utils.helpers import calculate_future_values
+
+MONTHS_PER_YEAR = 12
+
+# Value arrays held by a CashFlowProjection
+CASH_FLOW_COLUMNS = ('portfolio_value', 'sp500_benchmark', 'initial_plus_contributions')
+
+class CashFlowProjection:
+    """
+    Month-by-month projection arrays for one or more portfolios
+    
+    Every value array has shape (portfolios, months + 1) with month 0 holding
+    the initial investment. Months past a portfolio's horizon are NaN.
+    yearly() returns strided views, so the yearly table costs no copy.
+    """
+    
+    __slots__ = ('month', 'portfolio_value', 'sp500_benchmark', 'initial_plus_contributions')
+    
+    def __init__(self, month, portfolio_value, sp500_benchmark, initial_plus_contributions):
+        self.month = month
+        self.portfolio_value = portfolio_value
+        self.sp500_benchmark = sp500_benchmark
+        self.initial_plus_contributions = initial_plus_contributions
+    
+    @property
+    def year(self):
+        """Time of every step in years"""
+        return self.month / MONTHS_PER_YEAR
+    
+    def yearly(self):
+        """View of the projection at the start and end of every year"""
+        step = slice(None, None, MONTHS_PER_YEAR)
+        return CashFlowProjection(
+            self.month[step],
+            self.portfolio_value[:, step],
+            self.sp500_benchmark[:, step],
+            self.initial_plus_contributions[:, step]
+        )
+    
+    def to_frame(self, portfolio=0):
+        """Get one portfolio's projection as a DataFrame with a year column"""
+        years = self.month // MONTHS_PER_YEAR if np.all(self.month % MONTHS_PER_YEAR == 0) else self.year
+        return pd.DataFrame({
+            'year': years,
+            **{column: getattr(self, column)[portfolio] for column in CASH_FLOW_COLUMNS}
+        })
+
+def project_cash_flows(initial_investment, monthly_contribution, portfolio_return, sp500_return, months):
+    """
+    Project values with monthly contributions and monthly compounding
+    
+    Contributions are made at the end of every month and the annual returns
+    are converted to the equivalent monthly rates. Arguments broadcast, so
+    arrays project many portfolios at once.
+    
+    Args:
+        initial_investment: Initial investment
+        monthly_contribution: Contribution at the end of every month
+        portfolio_return: Annual portfolio return
+        sp500_return: Annual S&P 500 return
+        months: Projection horizon in months
+    
+    Returns:
+        CashFlowProjection over the longest horizon
+    """
+    initial, monthly, portfolio_rate, sp500_rate, horizon = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in (
+            initial_investment, monthly_contribution, portfolio_return, sp500_return, months
+        ))
+    )
+    
+    # Month grid shared by every portfolio, as a (1, months) row
+    month = np.arange(int(horizon.max(initial=0)) + 1)
+    month_grid = month[np.newaxis, :]
+    
+    values = {
+        'portfolio_value': calculate_future_values(
+            initial[:, np.newaxis], np.expm1(np.log1p(portfolio_rate) / MONTHS_PER_YEAR)[:, np.newaxis],
+            month_grid, monthly[:, np.newaxis]
+        ),
+        'sp500_benchmark': calculate_future_values(
+            initial[:, np.newaxis], np.expm1(np.log1p(sp500_rate) / MONTHS_PER_YEAR)[:, np.newaxis],
+            month_grid, monthly[:, np.newaxis]
+        ),
+        'initial_plus_contributions': initial[:, np.newaxis] + monthly[:, np.newaxis] * month_grid
+    }
+    
+    # Blank out the months after each portfolio's horizon
+    beyond_horizon = month_grid > horizon[:, np.newaxis]
+    for column in CASH_FLOW_COLUMNS:
+        values[column][beyond_horizon] = np.nan
+    
+    return CashFlowProjection(month, **values)
@@ -0,0 +1,143 @@
+import threading
+from datetime import date, datetime, time
+import numpy as np
+from data.etf_data import DAYS_PER_YEAR
+from services.etf_service import get_price_store
+from utils.cache import LRUCache
+
+class CovarianceEngine:
+    """
+    Covariance of daily returns over a fixed set of symbols, kept as running sums
+
+    Only the observation count, the per-symbol sums and the sums of outer
+    products are stored, so adding a new day costs O(k^2) instead of a full
+    recompute over the history.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.count = 0
+        self.sums = np.zeros(len(self.symbols))
+        self.cross_sums = np.zeros((len(self.symbols), len(self.symbols)))
+        self.last_date = None
+        self._covariance = None
+
+    def copy(self):
+        """Get an independent copy that can be updated without touching this engine"""
+        engine = CovarianceEngine(self.symbols)
+        engine.count = self.count
+        engine.sums = self.sums.copy()
+        engine.cross_sums = self.cross_sums.copy()
+        engine.last_date = self.last_date
+        return engine
+
+    def update(self, returns, last_date=None):
+        """
+        Add one or more days of returns
+
+        Args:
+            returns: Array of shape (days, symbols) or (symbols,) of daily returns
+            last_date: Date of the last row, recorded for incremental updates
+        """
+        returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+        self.count += returns.shape[0]
+        self.sums += returns.sum(axis=0)
+        self.cross_sums += returns.T @ returns
+        if last_date is not None:
+            self.last_date = last_date
+        self._covariance = None
+
+    def expected_returns(self):
+        """Get the annualized mean return per symbol (price store rows are calendar days)"""
+        return self.sums / max(self.count, 1) * DAYS_PER_YEAR
+
+    def covariance(self):
+        """Get the annualized covariance matrix"""
+        if self._covariance is None:
+            if self.count < 2:
+                raise ValueError("At least two days of returns are needed for a covariance")
+            daily = (self.cross_sums - np.outer(self.sums, self.sums) / self.count) / (self.count - 1)
+            self._covariance = daily * DAYS_PER_YEAR
+        return self._covariance
+
+    def correlation(self):
+        """Get the correlation matrix"""
+        covariance = self.covariance()
+        volatility = np.sqrt(np.diag(covariance))
+        return covariance / np.outer(volatility, volatility)
+
+    def _positions(self, symbols):
+        return np.array([self.index[symbol] for symbol in symbols], dtype=np.int64)
+
+    def subset(self, symbols):
+        """Get (expected returns, covariance) restricted to some symbols"""
+        positions = self._positions(symbols)
+        return self.expected_returns()[positions], self.covariance()[np.ix_(positions, positions)]
+
+    def weights_from_allocations(self, allocations):
+        """
+        Build a weight vector from calculate_etf_allocations output
+
+        Returns:
+            Tuple of (symbols, weights) for the allocations the engine knows about
+        """
+        known = [etf for etf in allocations if etf['symbol'] in self.index]
+        symbols = [etf['symbol'] for etf in known]
+        weights = np.array([etf['allocation'] for etf in known], dtype=np.float64)
+        return symbols, weights
+
+    def portfolio_variance(self, weights, symbols=None):
+        """
+        Get the annualized variance of a portfolio in O(k^2)
+
+        Args:
+            weights: Weight vector, over symbols if given, otherwise over all engine symbols
+            symbols: Optional symbols the weights refer to
+        """
+        covariance = self.covariance() if symbols is None else self.subset(symbols)[1]
+        weights = np.asarray(weights, dtype=np.float64)
+        return float(weights @ covariance @ weights)
+
+    def portfolio_variances(self, weights, symbols=None):
+        """Get the annualized variances for a batch of weight vectors, shape (portfolios, k)"""
+        covariance = self.covariance() if symbols is None else self.subset(symbols)[1]
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        return np.einsum('ij,jk,ik->i', weights, covariance, weights)
+
+# Engines per as-of date, and the most recent one used as the base for incremental updates
+covariance_cache = LRUCache(max_entries=8)
+_latest_engine = None
+_latest_engine_lock = threading.Lock()
+
+def _build_covariance_engine(as_of):
+    """Build the engine for an as-of date, extending the latest engine where possible"""
+    global _latest_engine
+    store = get_price_store(as_of)
+    symbols = store.symbols
+    end_date = datetime.combine(as_of, time())
+
+    with _latest_engine_lock:
+        base = _latest_engine
+    if base is not None and base.symbols == symbols and base.last_date <= end_date:
+        # Only the days after the base engine's last date are new
+        engine = base.copy()
+        dates, prices = store.read(symbols, base.last_date, end_date)
+    else:
+        engine = CovarianceEngine(symbols)
+        dates, prices = store.read(symbols, None, end_date)
+
+    if len(dates) > 1:
+        engine.update(prices[1:] / prices[:-1] - 1, dates[-1].to_pydatetime())
+
+    with _latest_engine_lock:
+        if _latest_engine is None or _latest_engine.last_date <= engine.last_date:
+            _latest_engine = engine
+
+    return engine
+
+def get_covariance_engine(as_of=None):
+    """Get the covariance engine over the ETF universe for an as-of date (cached)"""
+    if as_of is None:
+        as_of = date.today()
+    return covariance_cache.get_or_create(as_of, lambda: _build_covariance_engine(as_of))
@@ -1,12 +1,21 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import random
+from datetime import date, datetime, time, timedelta
+import threading
+from dataclasses import dataclass
 from utils.helpers import get_random_return, generate_date_range
 from utils.constants import SP500_SECTOR_WEIGHTS
+from utils.cache import LRUCache
+from utils.rng import get_generator
+from data.etf_data import generate_historical_price_matrix
+from data.price_store import PriceStore
+import config
 
-# Dictionary to store ETF data to avoid regenerating it
-cached_etf_data = {}
+# Bounded cache of generated histories, keyed on (symbol, years, as-of date)
+history_cache = LRUCache(
+    max_entries=config.HISTORY_CACHE_MAX_ENTRIES,
+    max_bytes=config.HISTORY_CACHE_MAX_BYTES
+)
 
 def get_tech_etfs():
     """Get a list of tech ETFs"""
@@ -50,19 +59,117 @@ def get_complementary_etfs():
     ]
     return complementary_etfs
 
+@dataclass(frozen=True, slots=True)
+class ETFRecord:
+    """Immutable catalog entry for a single ETF"""
+    symbol: str
+    name: str
+    category: str
+    sector: str = None
+    expense_ratio: float = 0.0
+
+    @property
+    def option(self):
+        """Label used for the ETF in multiselect widgets"""
+        return f"{self.symbol} - {self.name}"
+
+    def to_dict(self):
+        """Convert the record to the details dictionary used by the UI and reports"""
+        details = {
+            'symbol': self.symbol,
+            'name': self.name,
+            'category': self.category,
+            'expense_ratio': self.expense_ratio
+        }
+        if self.sector:
+            details['sector'] = self.sector
+        return details
+
+class ETFCatalog:
+    """Read-only ETF universe indexed by symbol, category and sector"""
+
+    __slots__ = ('records', 'by_symbol', 'by_category', 'by_sector', '_options_by_category')
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        self.by_symbol = {record.symbol: record for record in self.records}
+
+        by_category = {}
+        by_sector = {}
+        for record in self.records:
+            by_category.setdefault(record.category, []).append(record)
+            if record.sector:
+                by_sector.setdefault(record.sector, []).append(record)
+
+        self.by_category = {category: tuple(records) for category, records in by_category.items()}
+        self.by_sector = {sector: tuple(records) for sector, records in by_sector.items()}
+        self._options_by_category = {
+            category: tuple(record.option for record in records)
+            for category, records in self.by_category.items()
+        }
+
+    def get(self, symbol):
+        """Get the record for a symbol, or None if it is not in the catalog"""
+        return self.by_symbol.get(symbol)
+
+    def symbols(self, category):
+        """Get the symbols in a category, in catalog order"""
+        return [record.symbol for record in self.by_category.get(category, ())]
+
+    def options(self, category):
+        """Get the prebuilt "SYMBOL - Name" options for a category"""
+        return self._options_by_category.get(category, ())
+
+    def option(self, symbol):
+        """Get the "SYMBOL - Name" option for a symbol, falling back to the bare symbol"""
+        record = self.by_symbol.get(symbol)
+        return record.option if record else f"{symbol} - {symbol}"
+
+    def options_for(self, symbols, category=None):
+        """Get the options for the catalog symbols in the list, optionally limited to a category"""
+        options = []
+        for symbol in symbols:
+            record = self.by_symbol.get(symbol)
+            if record and (category is None or record.category == category):
+                options.append(record.option)
+        return options
+
+_etf_catalog = None
+_etf_catalog_lock = threading.Lock()
+
+def get_etf_catalog():
+    """Get the process-wide ETF catalog, building it on first use"""
+    global _etf_catalog
+    if _etf_catalog is None:
+        with _etf_catalog_lock:
+            if _etf_catalog is None:
+                records = [
+                    ETFRecord(
+                        symbol=etf['symbol'],
+                        name=etf['name'],
+                        category='Tech ETFs',
+                        expense_ratio=etf['expense_ratio']
+                    )
+                    for etf in get_tech_etfs()
+                ]
+                records += [
+                    ETFRecord(
+                        symbol=etf['symbol'],
+                        name=etf['name'],
+                        category='Complementary ETFs',
+                        sector=etf.get('sector'),
+                        expense_ratio=etf['expense_ratio']
+                    )
+                    for etf in get_complementary_etfs()
+                ]
+                _etf_catalog = ETFCatalog(records)
+    return _etf_catalog
+
 def get_etf_details(symbol):
     """Get details for a specific ETF"""
-    # Look for ETF in tech ETFs
-    for etf in get_tech_etfs():
-        if etf['symbol'] == symbol:
-            etf['category'] = 'Tech ETFs'
-            return etf
-    
-    # Look for ETF in complementary ETFs
-    for etf in get_complementary_etfs():
-        if etf['symbol'] == symbol:
-            etf['category'] = 'Complementary ETFs'
-            return etf
+    record = get_etf_catalog().get(symbol)
+    if record:
+        return record.to_dict()
     
     # ETF not found
     return {
@@ -72,57 +179,248 @@ def get_etf_details(symbol):
         'expense_ratio': 0.0050
     }
 
+# Periods covered by the returns table, in column order
+RETURN_PERIODS = ('1y', '3y', '5y')
+
+_etf_returns_table = None
+_etf_returns_matrix = None
+_etf_returns_lock = threading.Lock()
+
+def _calculate_etf_returns(symbol, category):
+    """Generate the 1y/3y/5y returns for an ETF based on its category"""
+    # Draw from the symbol's own stream for consistency
+    generator = get_generator(symbol, 'trailing_returns')
+    
+    # Base returns by category
+    if category == 'Tech ETFs':
+        base_return_1y = 0.12 + generator.uniform(-0.05, 0.10)
+        base_return_3y = 0.15 + generator.uniform(-0.05, 0.15)
+        base_return_5y = 0.18 + generator.uniform(-0.05, 0.20)
+    else:
+        base_return_1y = 0.08 + generator.uniform(-0.05, 0.07)
+        base_return_3y = 0.10 + generator.uniform(-0.05, 0.10)
+        base_return_5y = 0.12 + generator.uniform(-0.05, 0.15)
+    
+    return (base_return_1y, base_return_3y, base_return_5y)
+
+def get_etf_returns_table():
+    """Get the returns table for the ETF universe as a DataFrame indexed by symbol"""
+    global _etf_returns_table, _etf_returns_matrix
+    if _etf_returns_table is None:
+        with _etf_returns_lock:
+            if _etf_returns_table is None:
+                catalog = get_etf_catalog()
+                matrix = np.array(
+                    [_calculate_etf_returns(record.symbol, record.category) for record in catalog.records],
+                    dtype=np.float64
+                ).reshape(-1, len(RETURN_PERIODS))
+                matrix.setflags(write=False)
+                
+                _etf_returns_matrix = matrix
+                _etf_returns_table = pd.DataFrame(
+                    matrix,
+                    index=pd.Index([record.symbol for record in catalog.records], name='symbol'),
+                    columns=list(RETURN_PERIODS)
+                )
+    return _etf_returns_table
+
+def get_etf_returns(symbols):
+    """
+    Get historical returns for several ETFs in one lookup
+    
+    Args:
+        symbols: List of ETF symbols
+    
+    Returns:
+        Float array of shape (symbols, periods) with columns ordered as RETURN_PERIODS
+    """
+    table = get_etf_returns_table()
+    positions = table.index.get_indexer(symbols)
+    returns = _etf_returns_matrix[positions]
+    
+    # Symbols outside the catalog are generated on demand
+    for row in np.flatnonzero(positions < 0):
+        returns[row] = _calculate_etf_returns(symbols[row], 'Unknown')
+    
+    return returns
+
 def get_etf_return(symbol):
     """Get historical returns for a specific ETF"""
-    # We'll generate random returns based on the ETF category
-    etf = get_etf_details(symbol)
+    returns = get_etf_returns([symbol])[0]
+    return {period: float(value) for period, value in zip(RETURN_PERIODS, returns)}
+
+# Benchmark symbol stored alongside the ETF universe
+SP500_SYMBOL = 'SPY'
+
+# Initial price, annual return and volatility used to synthesize daily prices
+PRICE_PARAMETERS = {
+    'Tech ETFs': (100.0, 0.12, 0.14),
+    'Complementary ETFs': (100.0, 0.084, 0.10),
+    SP500_SYMBOL: (4000.0, 0.08, 0.15)
+}
+
+price_store = PriceStore()
+_price_store_lock = threading.Lock()
+
+def _price_store_universe():
+    """Get the stored symbols and their (initial price, annual return, volatility) arrays"""
+    records = get_etf_catalog().records
+    symbols = [record.symbol for record in records] + [SP500_SYMBOL]
+    parameters = np.array(
+        [PRICE_PARAMETERS[record.category] for record in records] + [PRICE_PARAMETERS[SP500_SYMBOL]],
+        dtype=np.float64
+    )
+    return symbols, parameters
+
+def get_price_store(as_of=None):
+    """
+    Get the on-disk price store, making sure it covers the universe up to as_of
+
+    The store is generated once; later days are appended without rewriting
+    the existing rows.
+    """
+    if as_of is None:
+        as_of = date.today()
+
+    with _price_store_lock:
+        symbols, parameters = _price_store_universe()
+        end_date = datetime.combine(as_of, time())
+        
+        if not price_store.exists() or price_store.symbols != symbols:
+            start_date = end_date - timedelta(days=config.PRICE_STORE_YEARS * 365)
+            _, prices = generate_historical_price_matrix(
+                symbols,
+                start_date,
+                end_date + timedelta(days=1),
+                initial_prices=parameters[:, 0],
+                annual_returns=parameters[:, 1],
+                volatilities=parameters[:, 2]
+            )
+            price_store.create(symbols, start_date, prices, dtype=config.PRICE_STORE_DTYPE)
+        elif price_store.end_date < end_date:
+            # Continue every path from the last stored prices
+            first_new_date = price_store.end_date + timedelta(days=1)
+            _, prices = generate_historical_price_matrix(
+                symbols,
+                first_new_date,
+                end_date + timedelta(days=1),
+                initial_prices=price_store.last_prices(),
+                annual_returns=parameters[:, 1],
+                volatilities=parameters[:, 2]
+            )
+            price_store.append(prices, first_new_date)
     
-    # Set seed based on symbol for consistency
-    random.seed(sum(ord(c) for c in symbol))
+    return price_store
+
+def get_etf_historical_data(symbol, years=5, as_of=None, frequency='monthly'):
+    """
+    Get historical price data for a specific ETF
+
+    Args:
+        symbol: ETF symbol
+        years: Number of years of history
+        as_of: Last date of the history (defaults to today)
+        frequency: 'monthly' for month-end values or 'daily' for every stored day
+
+    Returns:
+        DataFrame with historical data, shared with other callers and read-only
+    """
+    if as_of is None:
+        as_of = date.today()
+
+    return history_cache.get_or_create(
+        (symbol, years, as_of, frequency),
+        lambda: _load_etf_historical_data(symbol, years, as_of, frequency)
+    )
+
+def get_history_cache_stats():
+    """Get hit/miss/eviction counters for the ETF history cache"""
+    return history_cache.stats()
+
+def _load_etf_historical_data(symbol, years, as_of, frequency):
+    """Sample values for an ETF from ingested prices or the price store"""
+    end_date = datetime.combine(as_of, time())
+    start_date = end_date - timedelta(days=years * 365)
     
-    # Base returns by category
-    if etf['category'] == 'Tech ETFs':
-        base_return_1y = 0.12 + random.uniform(-0.05, 0.10)
-        base_return_3y = 0.15 + random.uniform(-0.05, 0.15)
-        base_return_5y = 0.18 + random.uniform(-0.05, 0.20)
-    else:
-        base_return_1y = 0.08 + random.uniform(-0.05, 0.07)
-        base_return_3y = 0.10 + random.uniform(-0.05, 0.10)
-        base_return_5y = 0.12 + random.uniform(-0.05, 0.15)
+    # Prefer ingested end-of-day prices when the database has them
+    df = _load_ingested_etf_historical_data(symbol, start_date, end_date, frequency)
+    if df is not None:
+        return df
     
-    # Return dictionary
-    return {
-        '1y': base_return_1y,
-        '3y': base_return_3y,
-        '5y': base_return_5y
-    }
+    store = get_price_store(as_of)
+    if not store.has_symbol(symbol):
+        return _generate_etf_historical_data(symbol, years, as_of)
+    
+    # The store only reaches back PRICE_STORE_YEARS, so longer histories start at its first date
+    start_date = max(start_date, store.start_date)
+    
+    # Zero-copy daily slice of the mapped file
+    dates, prices = store.read(symbol, start_date, end_date)
+    
+    # Keep month-end (or all) prices, rebased to 100 at the start of the window
+    keep = np.ones(len(dates), dtype=bool) if frequency == 'daily' else dates.is_month_end
+    if not keep.any():
+        # Nothing stored for the window (e.g. as_of before the store's first date)
+        return _generate_etf_historical_data(symbol, years, as_of)
+    values = 100.0 * prices[keep] / prices[0]
+    
+    # Create dataframe
+    df = pd.DataFrame({
+        'date': dates[keep],
+        'value': values,
+        'value_normalized': values / values[0]
+    })
+    
+    return df
 
-def get_etf_historical_data(symbol, years=5):
-    """Get historical price data for a specific ETF"""
-    # Check if we've already generated data for this ETF
-    if symbol in cached_etf_data:
-        return cached_etf_data[symbol]
+def _load_ingested_etf_historical_data(symbol, start_date, end_date, frequency):
+    """Sample closes from the etf_prices table, or None if it has no rows for the period"""
+    from database.db_service import get_etf_price_history
+    
+    prices = get_etf_price_history(symbol, start_date.date(), end_date.date())
+    if prices.empty:
+        return None
+    
+    # Keep the last trading day of each month (or every day), rebased to 100 at the start of the window
+    dates = pd.to_datetime(prices['date'])
+    closes = prices['close'].to_numpy(dtype=np.float64)
+    if frequency == 'daily':
+        keep = np.ones(len(dates), dtype=bool)
+    else:
+        keep = dates.dt.to_period('M').ne(dates.dt.to_period('M').shift(-1)).to_numpy()
+    values = 100.0 * closes[keep] / closes[0]
     
+    # Create dataframe
+    df = pd.DataFrame({
+        'date': dates[keep].reset_index(drop=True),
+        'value': values,
+        'value_normalized': values / values[0]
+    })
+    
+    return df
+
+def _generate_etf_historical_data(symbol, years, as_of):
+    """Generate monthly historical data for an ETF ending on the as-of date"""
     # Get ETF details
     etf = get_etf_details(symbol)
     category = etf.get('category', 'Unknown')
     
-    # Set seed based on symbol for consistency
-    random.seed(sum(ord(c) for c in symbol))
+    # Draw from the symbol's own stream for this as-of date
+    generator = get_generator(symbol, 'monthly_history', as_of)
     
     # Generate dates
-    end_date = datetime.now()
+    end_date = datetime.combine(as_of, time())
     start_date = end_date - timedelta(days=years * 365)
-    dates = pd.date_range(start=start_date, end=end_date, freq='M')
+    dates = pd.date_range(start=start_date, end=end_date, freq='ME')
     
     # Base starting value
     start_value = 100.0
     
     # Generate monthly returns based on category
     if category == 'Tech ETFs':
-        monthly_returns = np.random.normal(0.01, 0.04, size=len(dates))
+        monthly_returns = generator.normal(0.01, 0.04, size=len(dates))
     else:
-        monthly_returns = np.random.normal(0.007, 0.03, size=len(dates))
+        monthly_returns = generator.normal(0.007, 0.03, size=len(dates))
     
     # Calculate cumulative values
     values = [start_value]
@@ -140,7 +438,4 @@ def get_etf_historical_data(symbol, years=5):
         'value_normalized': normalized_values
     })
     
-    # Cache the data
-    cached_etf_data[symbol] = df
-    
     return df
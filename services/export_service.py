@@ -6,11 +6,14 @@ from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-from services.portfolio_service import calculate_etf_allocations, get_weighted_portfolio_return
 from utils.helpers import format_currency, format_percentage
 
-def export_to_csv(user, projection_data, alpha_data):
-    """Export portfolio data to CSV"""
+def export_to_csv(context):
+    """Export portfolio data from a PortfolioContext to CSV"""
+    user = context.user
+    projection_data = context.projection
+    alpha_data = context.alpha
+    
     # Create a buffer for the CSV data
     buffer = io.StringIO()
     
@@ -22,7 +25,7 @@ def export_to_csv(user, projection_data, alpha_data):
     })
     
     # ETF allocations
-    etf_allocations = calculate_etf_allocations(user)
+    etf_allocations = context.allocations
     etf_df = pd.DataFrame([
         {
             'Symbol': etf['symbol'],
@@ -33,7 +36,7 @@ def export_to_csv(user, projection_data, alpha_data):
     ])
     
     # Weighted returns
-    returns = get_weighted_portfolio_return(user)
+    returns = context.weighted_returns
     returns_df = pd.DataFrame({
         'Period': ['1 Year', '3 Years', '5 Years'],
         'Return': [returns['1y'], returns['3y'], returns['5y']]
@@ -59,8 +62,12 @@ def export_to_csv(user, projection_data, alpha_data):
     buffer.seek(0)
     return buffer.getvalue()
 
-def create_pdf_report(user, projection_data, alpha_data):
-    """Create a PDF report of the portfolio"""
+def create_pdf_report(context):
+    """Create a PDF report of the portfolio from a PortfolioContext"""
+    user = context.user
+    projection_data = context.projection
+    alpha_data = context.alpha
+    
     # Create a buffer for the PDF
     buffer = io.BytesIO()
     
@@ -117,7 +124,7 @@ def create_pdf_report(user, projection_data, alpha_data):
     elements.append(Paragraph("ETF Allocations", heading_style))
     elements.append(Spacer(1, 12))
     
-    etf_allocations = calculate_etf_allocations(user)
+    etf_allocations = context.allocations
     
     if etf_allocations:
         etf_data = [["Symbol", "Category", "Allocation", "Value"]]
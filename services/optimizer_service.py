@@ -0,0 +1,245 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from services.covariance_service import get_covariance_engine
+from utils.cache import LRUCache
+import config
+
+# Default frontier grid: tech sleeve totals across the mandate range x risk aversion levels
+FRONTIER_ALLOCATION_STEPS = 21
+FRONTIER_RISK_AVERSION = np.logspace(-1, 3, 100)
+
+class FrontierResult:
+    """
+    Optimal portfolios over a grid of tech sleeve totals and risk aversions
+
+    Every array has one row per grid point; the efficient frontier is the
+    subset of points that no other point beats on both return and volatility.
+    """
+
+    __slots__ = ('symbols', 'categories', 'weights', 'tech_allocation', 'risk_aversion',
+                 'expected_return', 'volatility', 'sharpe_ratio', 'efficient', 'max_sharpe')
+
+    def __init__(self, symbols, categories, weights, tech_allocation, risk_aversion, expected_return, volatility):
+        self.symbols = symbols
+        self.categories = categories
+        self.weights = weights
+        self.tech_allocation = tech_allocation
+        self.risk_aversion = risk_aversion
+        self.expected_return = expected_return
+        self.volatility = volatility
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.sharpe_ratio = np.where(volatility > 0, (expected_return - config.RISK_FREE_RATE) / volatility, np.nan)
+        self.efficient = _efficient_mask(expected_return, volatility)
+        # No max-Sharpe point when no Sharpe ratio is defined (e.g. zero volatility everywhere)
+        defined = ~np.isnan(self.sharpe_ratio)
+        self.max_sharpe = int(np.nanargmax(self.sharpe_ratio)) if defined.any() else None
+
+    def max_sharpe_weights(self):
+        """Get the max-Sharpe portfolio as a {symbol: weight} dictionary, None without one"""
+        if self.max_sharpe is None:
+            return None
+        return dict(zip(self.symbols, self.weights[self.max_sharpe].tolist()))
+
+    def to_frame(self, efficient_only=True):
+        """Get the frontier points as a DataFrame sorted by volatility"""
+        rows = self.efficient if efficient_only else np.ones(len(self.volatility), dtype=bool)
+        df = pd.DataFrame({
+            'tech_allocation': self.tech_allocation[rows],
+            'risk_aversion': self.risk_aversion[rows],
+            'expected_return': self.expected_return[rows],
+            'volatility': self.volatility[rows],
+            'sharpe_ratio': self.sharpe_ratio[rows],
+            **{symbol: self.weights[rows, i] for i, symbol in enumerate(self.symbols)}
+        })
+        return df.sort_values('volatility').reset_index(drop=True)
+
+def _efficient_mask(expected_return, volatility):
+    """Flag the points with a higher return than every point of lower volatility"""
+    order = np.argsort(volatility, kind='stable')
+    sorted_returns = expected_return[order]
+    best_before = np.maximum.accumulate(np.concatenate(([-np.inf], sorted_returns[:-1])))
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order] = sorted_returns > best_before
+    return mask
+
+def project_to_simplex(values, totals):
+    """
+    Euclidean projection of every row onto {w >= 0, sum(w) = total}
+
+    Args:
+        values: Array of shape (rows, k)
+        totals: Array of shape (rows,) with the sum each row must have
+
+    Returns:
+        Array of shape (rows, k)
+    """
+    k = values.shape[1]
+    ordered = -np.sort(-values, axis=1)
+    shifted = np.cumsum(ordered, axis=1) - totals[:, np.newaxis]
+    positions = np.arange(1, k + 1)
+
+    # Largest position whose threshold still leaves that element positive
+    active = ordered - shifted / positions > 0
+    count = k - np.argmax(active[:, ::-1], axis=1)
+    threshold = shifted[np.arange(len(values)), count - 1] / count
+    return np.maximum(values - threshold[:, np.newaxis], 0)
+
+def _project_sleeves(weights, tech_columns, complementary_columns, tech_totals):
+    """Project each sleeve onto its own simplex (the sleeve totals differ by row)"""
+    projected = np.zeros_like(weights)
+    if len(tech_columns):
+        projected[:, tech_columns] = project_to_simplex(weights[:, tech_columns], tech_totals)
+    if len(complementary_columns):
+        projected[:, complementary_columns] = project_to_simplex(weights[:, complementary_columns], 1 - tech_totals)
+    return projected
+
+def solve_mean_variance(expected_returns, covariance, tech_columns, complementary_columns, tech_totals,
+                        risk_aversion, initial_weights=None, max_iterations=1000, tolerance=1e-10):
+    """
+    Maximize w.mu - risk_aversion / 2 * w'Σw for a batch of problems by projected gradient
+
+    Each row is one problem with its own tech sleeve total and risk aversion;
+    the whole batch moves with one matrix product per iteration.
+
+    Args:
+        expected_returns: Annual expected return per symbol, shape (k,)
+        covariance: Annual covariance matrix, shape (k, k)
+        tech_columns: Column indices of the tech sleeve
+        complementary_columns: Column indices of the complementary sleeve
+        tech_totals: Tech sleeve total per problem, shape (rows,)
+        risk_aversion: Risk aversion per problem, shape (rows,)
+        initial_weights: Optional warm start, shape (rows, k)
+        max_iterations: Iteration cap
+        tolerance: Stop once no weight moves by more than this
+
+    Returns:
+        Array of optimal weights, shape (rows, k)
+    """
+    rows = len(tech_totals)
+    if initial_weights is None:
+        # Equal split within each sleeve, like calculate_etf_allocations
+        initial_weights = np.zeros((rows, len(expected_returns)))
+        if len(tech_columns):
+            initial_weights[:, tech_columns] = (tech_totals / len(tech_columns))[:, np.newaxis]
+        if len(complementary_columns):
+            initial_weights[:, complementary_columns] = ((1 - tech_totals) / len(complementary_columns))[:, np.newaxis]
+    weights = _project_sleeves(np.array(initial_weights, dtype=np.float64), tech_columns, complementary_columns, tech_totals)
+
+    # Step 1/L with L the gradient's Lipschitz constant for each row
+    largest_eigenvalue = np.linalg.eigvalsh(covariance)[-1]
+    steps = 1 / np.maximum(risk_aversion * largest_eigenvalue, 1e-12)
+
+    for _ in range(max_iterations):
+        gradient = expected_returns - risk_aversion[:, np.newaxis] * (weights @ covariance)
+        updated = _project_sleeves(weights + steps[:, np.newaxis] * gradient, tech_columns, complementary_columns, tech_totals)
+        converged = np.abs(updated - weights).max() <= tolerance
+        weights = updated
+        if converged:
+            break
+
+    return weights
+
+# Frontiers per (tech ETFs, complementary ETFs, as-of date, grid), and the last
+# solution per basket used to warm start the next solve; both are bounded so
+# memory stays flat however many distinct baskets are seen
+frontier_cache = LRUCache(max_entries=64)
+warm_start_cache = LRUCache(max_entries=config.WARM_START_CACHE_MAX_ENTRIES, max_bytes=config.WARM_START_CACHE_MAX_BYTES)
+
+def _build_frontier(tech_etfs, complementary_etfs, as_of, steps, risk_aversion_levels):
+    """Solve the whole grid in one batch, warm started from the basket's previous solution"""
+    engine = get_covariance_engine(as_of)
+    symbols = [symbol for symbol in tech_etfs + complementary_etfs if symbol in engine.index]
+    tech_columns = np.array([i for i, symbol in enumerate(symbols) if symbol in tech_etfs], dtype=np.int64)
+    complementary_columns = np.array([i for i, symbol in enumerate(symbols) if symbol not in tech_etfs], dtype=np.int64)
+    if not symbols:
+        return None
+    expected_returns, covariance = engine.subset(symbols)
+
+    # An empty sleeve pins the tech total at 0% or 100%
+    if not len(complementary_columns):
+        tech_grid = np.ones(1)
+    elif not len(tech_columns):
+        tech_grid = np.zeros(1)
+    else:
+        tech_grid = np.linspace(config.MIN_TECH_ALLOCATION, config.MAX_TECH_ALLOCATION, steps)
+    tech_totals = np.repeat(tech_grid, len(risk_aversion_levels))
+    risk_aversion = np.tile(risk_aversion_levels, len(tech_grid))
+
+    warm_key = (tuple(symbols), tuple(tech_columns), len(tech_totals))
+    initial_weights = warm_start_cache.get(warm_key)
+
+    weights = solve_mean_variance(
+        expected_returns, covariance, tech_columns, complementary_columns,
+        tech_totals, risk_aversion, initial_weights=initial_weights
+    )
+
+    warm_start_cache.put(warm_key, weights)
+
+    categories = ['Tech ETFs' if symbol in tech_etfs else 'Complementary ETFs' for symbol in symbols]
+    portfolio_returns = weights @ expected_returns
+    volatility = np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', weights, covariance, weights), 0))
+    return FrontierResult(symbols, categories, weights, tech_totals, risk_aversion, portfolio_returns, volatility)
+
+def get_efficient_frontier(tech_etfs, complementary_etfs, as_of=None, steps=FRONTIER_ALLOCATION_STEPS,
+                           risk_aversion_levels=FRONTIER_RISK_AVERSION):
+    """
+    Get the mandate-constrained efficient frontier over a set of ETFs (cached)
+
+    The tech sleeve total is swept across the mandate range and, for each
+    total, the mean-variance optimum is found for every risk aversion level.
+
+    Args:
+        tech_etfs: Tech ETF symbols
+        complementary_etfs: Complementary ETF symbols
+        as_of: Date of the covariance estimate (defaults to today)
+        steps: Number of tech sleeve totals
+        risk_aversion_levels: Risk aversion levels per tech sleeve total
+
+    Returns:
+        FrontierResult shared with other callers and read-only, or None without ETFs
+    """
+    if as_of is None:
+        as_of = date.today()
+
+    risk_aversion_levels = np.asarray(risk_aversion_levels, dtype=np.float64)
+    key = (tuple(tech_etfs), tuple(complementary_etfs), as_of, steps, risk_aversion_levels.tobytes())
+    return frontier_cache.get_or_create(
+        key, lambda: _build_frontier(list(tech_etfs), list(complementary_etfs), as_of, steps, risk_aversion_levels)
+    )
+
+def get_user_frontier(user, as_of=None, allocations=None):
+    """
+    Get the efficient frontier over a user's ETFs and where their current portfolio sits
+
+    Args:
+        user: User whose ETFs span the frontier
+        as_of: Date of the price history
+        allocations: The user's calculate_etf_allocations output, if already computed
+
+    Returns:
+        Tuple of (FrontierResult, (volatility, expected return) of the current portfolio
+        or None if none of its ETFs are on the frontier), or (None, None) without ETFs
+    """
+    from services.portfolio_service import calculate_etf_allocations
+
+    tech_etfs = user.tech_etfs.split(',') if user.tech_etfs else []
+    complementary_etfs = user.complementary_etfs.split(',') if user.complementary_etfs else []
+    frontier = get_efficient_frontier(tech_etfs, complementary_etfs, as_of)
+    if frontier is None:
+        return None, None
+
+    # Score the current portfolio over the frontier's universe only, renormalizing
+    # the weights of any ETFs the frontier dropped onto the rest
+    engine = get_covariance_engine(as_of if as_of is not None else date.today())
+    if allocations is None:
+        allocations = calculate_etf_allocations(user)
+    covered = [etf for etf in allocations if etf['symbol'] in frontier.symbols]
+    symbols, weights = engine.weights_from_allocations(covered)
+    if weights.sum() <= 0:
+        return frontier, None
+    weights = weights / weights.sum()
+
+    expected_returns, _ = engine.subset(symbols)
+    current = (float(np.sqrt(engine.portfolio_variance(weights, symbols))), float(weights @ expected_returns))
+    return frontier, current
@@ -0,0 +1,86 @@
+from functools import cached_property
+import pandas as pd
+from services.etf_service import get_etf_details, get_etf_returns, RETURN_PERIODS
+from services.portfolio_service import calculate_etf_allocations, calculate_weighted_return, get_portfolio_allocation, get_portfolio_value
+from services.projection_service import get_projection_result
+
+class PortfolioContext:
+    """
+    Everything derived from a user's portfolio during one dashboard render
+
+    Each value is computed on first use and reused for the rest of the
+    render, so components and exports share one set of allocations, returns
+    and projections instead of recomputing them from the User. Create a new
+    context after the portfolio changes.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def tech_etfs(self):
+        return self.user.tech_etfs.split(',') if self.user.tech_etfs else []
+
+    @cached_property
+    def complementary_etfs(self):
+        return self.user.complementary_etfs.split(',') if self.user.complementary_etfs else []
+
+    @cached_property
+    def holding_values(self):
+        """{symbol: market value} of the recorded holdings, looked up once per render"""
+        from services.valuation_service import get_holding_values
+
+        return get_holding_values(self.user)
+
+    @cached_property
+    def current_value(self):
+        return get_portfolio_value(self.user, self.holding_values)
+
+    @cached_property
+    def allocation_data(self):
+        """Tech/complementary split for charts, as returned by get_portfolio_allocation"""
+        return get_portfolio_allocation(self.user)
+
+    @cached_property
+    def allocations(self):
+        """Per-ETF allocations, as returned by calculate_etf_allocations"""
+        return calculate_etf_allocations(self.user, self.holding_values)
+
+    @cached_property
+    def weighted_returns(self):
+        """Weighted 1y/3y/5y portfolio returns"""
+        return calculate_weighted_return(self.allocations)
+
+    @cached_property
+    def projection_result(self):
+        return get_projection_result(self.user)
+
+    @property
+    def projection(self):
+        return self.projection_result.projection
+
+    @property
+    def alpha(self):
+        return self.projection_result.alpha
+
+    @cached_property
+    def etf_table(self):
+        """
+        One row per held ETF with its details, allocation, value and trailing returns
+
+        Returns:
+            DataFrame with symbol, name, category, allocation, value and one column per RETURN_PERIODS entry
+        """
+        symbols = [etf['symbol'] for etf in self.allocations]
+        returns = get_etf_returns(symbols)
+
+        etf_table = pd.DataFrame({
+            'symbol': symbols,
+            'name': [get_etf_details(symbol)['name'] for symbol in symbols],
+            'category': [etf['category'] for etf in self.allocations],
+            'allocation': [etf['allocation'] for etf in self.allocations],
+            'value': [etf['value'] for etf in self.allocations]
+        })
+        for i, period in enumerate(RETURN_PERIODS):
+            etf_table[period] = returns[:, i]
+        return etf_table
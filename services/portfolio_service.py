@@ -1,5 +1,6 @@
 import pandas as pd
-from services.etf_service import get_etf_details, get_etf_return
+import numpy as np
+from services.etf_service import get_etf_returns, RETURN_PERIODS
 
 def get_portfolio_allocation(user):
     """Get the portfolio allocation data for charts"""
@@ -10,8 +11,14 @@ def get_portfolio_allocation(user):
     
     return pd.DataFrame(allocation_data)
 
-def calculate_etf_allocations(user):
-    """Calculate the allocation for each ETF in the portfolio"""
+def calculate_etf_allocations(user, holding_values=None):
+    """
+    Calculate the allocation for each ETF in the portfolio
+    
+    Args:
+        user: User whose ETFs are allocated
+        holding_values: The user's {symbol: market value} holdings, if already looked up
+    """
     # Get ETF lists
     tech_etfs = user.tech_etfs.split(',') if user.tech_etfs else []
     complementary_etfs = user.complementary_etfs.split(',') if user.complementary_etfs else []
@@ -28,8 +35,11 @@ def calculate_etf_allocations(user):
     tech_allocation_per_etf = user.tech_allocation / max(1, tech_etf_count)
     complementary_allocation_per_etf = user.complementary_allocation / max(1, complementary_etf_count)
     
-    # Calculate portfolio value
-    portfolio_value = get_portfolio_value(user)
+    # Value each ETF at market prices when the portfolio has holdings,
+    # otherwise split the portfolio value by allocation
+    if holding_values is None:
+        holding_values = _get_holding_values(user)
+    portfolio_value = get_portfolio_value(user, holding_values)
     
     # Create allocation data
     allocations = []
@@ -39,7 +49,7 @@ def calculate_etf_allocations(user):
             'symbol': symbol,
             'category': 'Tech ETFs',
             'allocation': tech_allocation_per_etf,
-            'value': portfolio_value * tech_allocation_per_etf
+            'value': holding_values.get(symbol, 0.0) if holding_values else portfolio_value * tech_allocation_per_etf
         })
     
     for symbol in complementary_etfs:
@@ -47,22 +57,47 @@ def calculate_etf_allocations(user):
             'symbol': symbol,
             'category': 'Complementary ETFs',
             'allocation': complementary_allocation_per_etf,
-            'value': portfolio_value * complementary_allocation_per_etf
+            'value': holding_values.get(symbol, 0.0) if holding_values else portfolio_value * complementary_allocation_per_etf
         })
     
     return allocations
 
-def get_portfolio_value(user):
-    """Get the current value of the portfolio"""
-    # For simplicity, we'll just return the initial investment
-    # In a real app, this would calculate current value based on ETF prices
+def _get_holding_values(user):
+    """Get {symbol: market value} of a user's holdings, empty if none are recorded"""
+    from services.valuation_service import get_holding_values
+    
+    return get_holding_values(user)
+
+def get_portfolio_value(user, holding_values=None):
+    """Get the current value of the portfolio, reusing holding_values if already looked up"""
+    # Mark holdings to market; portfolios without recorded holdings fall back to the initial investment
+    if holding_values is None:
+        holding_values = _get_holding_values(user)
+    if holding_values:
+        return float(sum(holding_values.values()))
+    
     return float(user.initial_investment)
 
+def get_target_weights(user):
+    """
+    Get the target weight of every ETF, split equally within each sleeve
+    
+    Returns:
+        Tuple of (symbols, weights array)
+    """
+    tech_etfs = user.tech_etfs.split(',') if user.tech_etfs else []
+    complementary_etfs = user.complementary_etfs.split(',') if user.complementary_etfs else []
+    
+    weights = [user.tech_allocation / max(1, len(tech_etfs))] * len(tech_etfs)
+    weights += [user.complementary_allocation / max(1, len(complementary_etfs))] * len(complementary_etfs)
+    return tech_etfs + complementary_etfs, np.array(weights, dtype=np.float64)
+
 def get_weighted_portfolio_return(user):
     """Calculate the weighted return of the portfolio based on ETF allocations"""
-    # Get ETF allocations
-    allocations = calculate_etf_allocations(user)
-    
+    return calculate_weighted_return(calculate_etf_allocations(user))
+
+def calculate_weighted_return(allocations):
+    """Calculate the weighted 1y/3y/5y return of calculate_etf_allocations output"""
     if not allocations:
         return {
             '1y': 0,
@@ -70,23 +105,53 @@ def get_weighted_portfolio_return(user):
             '5y': 0
         }
     
-    # Initialize weighted returns
-    weighted_returns = {
-        '1y': 0,
-        '3y': 0,
-        '5y': 0
-    }
+    # Look up the returns for every ETF at once and weight them
+    symbols = [etf['symbol'] for etf in allocations]
+    weights = np.array([etf['allocation'] for etf in allocations], dtype=np.float64)
+    weighted_returns = weights @ get_etf_returns(symbols)
+    
+    return {period: float(value) for period, value in zip(RETURN_PERIODS, weighted_returns)}
+
+def get_weighted_portfolio_returns():
+    """
+    Calculate every user's weighted 1y/3y/5y return in one sparse matrix product
+    
+    The (users x ETFs) weight matrix is built in coordinate form straight from
+    the association tables and multiplied by the (ETFs x periods) returns matrix
+    without densifying it.
+    
+    Returns:
+        DataFrame indexed by user_id with one column per RETURN_PERIODS entry,
+        covering the users with at least one ETF association
+    """
+    from database.db_service import get_etf_allocation_entries
+    
+    entries = get_etf_allocation_entries()
+    if entries.empty:
+        return pd.DataFrame(columns=list(RETURN_PERIODS), index=pd.Index([], name='user_id'))
+    
+    # Coordinates of the non-zero weights
+    rows, user_ids = pd.factorize(entries['user_id'])
+    columns, symbols = pd.factorize(entries['symbol'])
+    weights = entries['allocation'].fillna(0.0).to_numpy(dtype=np.float64)
+    
+    # Scatter-add each weight times its ETF's returns into the user's row
+    weighted_returns = np.zeros((len(user_ids), len(RETURN_PERIODS)))
+    np.add.at(weighted_returns, rows, weights[:, np.newaxis] * get_etf_returns(list(symbols))[columns])
+    
+    return pd.DataFrame(
+        weighted_returns,
+        index=pd.Index(user_ids, name='user_id'),
+        columns=list(RETURN_PERIODS)
+    )
+
+def get_portfolio_volatility(user):
+    """Calculate the annualized volatility of the portfolio from the ETF covariance matrix"""
+    from services.covariance_service import get_covariance_engine
+    
+    engine = get_covariance_engine()
+    symbols, weights = engine.weights_from_allocations(calculate_etf_allocations(user))
+    if not symbols:
+        return 0.0
     
-    # Calculate weighted returns
-    for etf in allocations:
-        symbol = etf['symbol']
-        allocation = etf['allocation']
-        
-        # Get ETF returns
-        returns = get_etf_return(symbol)
-        
-        # Add weighted returns
-        for period in weighted_returns:
-            weighted_returns[period] += returns[period] * allocation
-    
-    return weighted_returns
+    return float(np.sqrt(engine.portfolio_variance(weights, symbols)))
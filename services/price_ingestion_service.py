@@ -0,0 +1,174 @@
+import io
+import os
+import sys
+import argparse
+import pandas as pd
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Allow running as `python services/price_ingestion_service.py <directory>`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_service import engine
+from database.models import Base, ETFPrice
+
+# Rows read from a CSV file per batch
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Accepted spellings of the input columns, most preferred first: the canonical
+# names win over aliases, except that adjusted closes win over raw closes
+COLUMN_ALIASES = {
+    'symbol': ('symbol', 'ticker'),
+    'date': ('date', 'timestamp'),
+    'close': ('adj close', 'adj_close', 'adjusted_close', 'close')
+}
+
+def iter_price_files(directory):
+    """Yield every CSV file under a directory, in a stable order"""
+    for root, _, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            if name.lower().endswith('.csv'):
+                yield os.path.join(root, name)
+
+def clean_price_chunk(chunk, default_symbol=None):
+    """
+    Normalize, validate and deduplicate a chunk of raw price rows
+
+    Args:
+        chunk: DataFrame read from a CSV file
+        default_symbol: Symbol to use when the file has no symbol column
+
+    Returns:
+        Tuple of (clean DataFrame with symbol/date/close columns, number of rejected rows)
+    """
+    # Map the columns onto symbol/date/close, taking the first spelling present
+    available = {str(column).strip().lower(): column for column in chunk.columns}
+    columns = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in available:
+                columns[name] = available[alias]
+                break
+    chunk = pd.DataFrame({name: chunk[column] for name, column in columns.items()})
+
+    if 'symbol' not in chunk.columns:
+        if default_symbol is None:
+            raise ValueError("Price files without a symbol column must be named after the symbol")
+        chunk = chunk.assign(symbol=default_symbol)
+    if 'date' not in chunk.columns or 'close' not in chunk.columns:
+        raise ValueError("Price files need date and close columns")
+
+    # Coerce types, turning anything unparseable into nulls
+    clean = pd.DataFrame({
+        'symbol': chunk['symbol'].astype('string').str.strip().str.upper(),
+        'date': pd.to_datetime(chunk['date'], errors='coerce').dt.date,
+        'close': pd.to_numeric(chunk['close'], errors='coerce')
+    })
+
+    # Reject incomplete rows and non-positive prices
+    valid = (clean['symbol'].fillna('') != '') & clean['date'].notna() & (clean['close'] > 0)
+    rejected = int((~valid).sum())
+    clean = clean[valid]
+
+    # The last row for a (symbol, date) wins
+    clean = clean.drop_duplicates(subset=['symbol', 'date'], keep='last')
+
+    return clean, rejected
+
+def _upsert_sqlite(connection, prices):
+    """Upsert a clean chunk with a single executemany statement"""
+    statement = sqlite_insert(ETFPrice.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=['symbol', 'date'],
+        set_={'close': statement.excluded.close}
+    )
+    connection.execute(statement, prices.to_dict('records'))
+
+def _upsert_postgresql(connection, prices):
+    """Upsert a clean chunk by COPYing it into a staging table and merging"""
+    buffer = io.StringIO()
+    prices.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS etf_prices_staging "
+            "(symbol TEXT, date DATE, close DOUBLE PRECISION) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert("COPY etf_prices_staging (symbol, date, close) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            "INSERT INTO etf_prices (symbol, date, close) "
+            "SELECT symbol, date, close FROM etf_prices_staging "
+            "ON CONFLICT (symbol, date) DO UPDATE SET close = EXCLUDED.close"
+        )
+    finally:
+        cursor.close()
+
+def upsert_prices(connection, prices):
+    """Bulk upsert a clean chunk into the etf_prices table"""
+    if prices.empty:
+        return
+
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        _upsert_sqlite(connection, prices)
+    elif dialect == 'postgresql':
+        _upsert_postgresql(connection, prices)
+    else:
+        raise ValueError(f"Bulk price ingestion is not supported for {dialect}")
+
+def ingest_price_file(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream one CSV file into the etf_prices table, one transaction per chunk"""
+    stats = {'rows_read': 0, 'rows_rejected': 0, 'rows_written': 0}
+    default_symbol = os.path.splitext(os.path.basename(path))[0].upper()
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str):
+        prices, rejected = clean_price_chunk(chunk, default_symbol)
+
+        with engine.begin() as connection:
+            upsert_prices(connection, prices)
+
+        stats['rows_read'] += len(chunk)
+        stats['rows_rejected'] += rejected
+        stats['rows_written'] += len(prices)
+
+    return stats
+
+def ingest_price_directory(directory, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Load every end-of-day CSV file under a directory into the etf_prices table
+
+    Args:
+        directory: Directory containing CSV files with symbol/date/close columns
+            (or one file per symbol, named after it, with date/close columns)
+        chunk_size: Rows read and written per batch
+
+    Returns:
+        Dictionary of file and row counts
+    """
+    Base.metadata.create_all(bind=engine, tables=[ETFPrice.__table__])
+
+    totals = {'files': 0, 'rows_read': 0, 'rows_rejected': 0, 'rows_written': 0}
+    for path in iter_price_files(directory):
+        stats = ingest_price_file(path, chunk_size)
+        totals['files'] += 1
+        for key, value in stats.items():
+            totals[key] += value
+
+    return totals
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Load end-of-day ETF price CSV files into the database")
+    parser.add_argument("directory", help="Directory containing CSV price files")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per batch")
+    args = parser.parse_args()
+
+    stats = ingest_price_directory(args.directory, args.chunk_size)
+    print(
+        f"Loaded {stats['rows_written']:,} rows from {stats['files']} files "
+        f"({stats['rows_rejected']:,} rejected, {stats['rows_read']:,} read)"
+    )
+
+if __name__ == "__main__":
+    main()
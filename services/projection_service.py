@@ -1,105 +1,390 @@
 import pandas as pd
 import numpy as np
-from utils.constants import RISK_RETURNS
-from utils.helpers import calculate_future_value
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from utils.constants import RISK_LEVELS, RISK_RETURNS, RISK_VOLATILITY, SIMULATION_SLEEVES, SLEEVE_CORRELATION
+from services.cashflow_service import project_cash_flows, MONTHS_PER_YEAR
+from utils.rng import spawn_seed_sequences
+from utils.quantile_sketch import LogBucketSketch
+from utils.cache import LRUCache, estimate_size
+from utils.helpers import calculate_cagr
+from services.alpha_service import compute_alpha_metrics, alpha_frame, alpha_summary
 import config
 
+# Projection columns produced by project_portfolio_values
+PROJECTION_COLUMNS = ('portfolio_value', 'sp500_benchmark', 'initial_plus_contributions')
+
+def _risk_level_returns(risk_tolerance, category):
+    """Map an array of risk levels to the annual return of a category"""
+    risk_tolerance = np.asarray(risk_tolerance)
+    returns = np.full(risk_tolerance.shape, np.nan)
+    for level in RISK_LEVELS:
+        returns[risk_tolerance == level] = RISK_RETURNS[level][category]
+    if np.isnan(returns).any():
+        raise ValueError(f"Unknown risk level in {np.unique(risk_tolerance).tolist()}")
+    return returns
+
+def project_portfolio_cash_flows(initial_investment, monthly_contribution, tech_allocation,
+                                 complementary_allocation, investment_duration, risk_tolerance):
+    """
+    Project portfolio, S&P 500 benchmark and contribution values month by month
+    
+    All arguments broadcast against each other, so scalars project a single
+    portfolio and arrays project many portfolios (e.g. every client) at once.
+    
+    Returns:
+        CashFlowProjection over the longest duration
+    """
+    initial, monthly, tech, complementary, duration, risk = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(initial_investment, dtype=np.float64)),
+        np.atleast_1d(np.asarray(monthly_contribution, dtype=np.float64)),
+        np.atleast_1d(np.asarray(tech_allocation, dtype=np.float64)),
+        np.atleast_1d(np.asarray(complementary_allocation, dtype=np.float64)),
+        np.atleast_1d(np.asarray(investment_duration, dtype=np.int64)),
+        np.atleast_1d(np.asarray(risk_tolerance))
+    )
+    
+    # Weighted portfolio return and benchmark return per portfolio
+    portfolio_return = _risk_level_returns(risk, 'tech') * tech + _risk_level_returns(risk, 'complementary') * complementary
+    sp500_return = _risk_level_returns(risk, 'sp500')
+    
+    return project_cash_flows(initial, monthly, portfolio_return, sp500_return, duration * MONTHS_PER_YEAR)
+
+def project_portfolio_values(initial_investment, monthly_contribution, tech_allocation,
+                             complementary_allocation, investment_duration, risk_tolerance):
+    """
+    Project portfolio, S&P 500 benchmark and contribution values for every year
+    
+    Same arguments as project_portfolio_cash_flows; the yearly values are a
+    view of the monthly cash-flow projection.
+    
+    Returns:
+        Dictionary with 'year' (years,) and one array of shape (portfolios, years)
+        per PROJECTION_COLUMNS entry; years past a portfolio's duration are NaN
+    """
+    yearly = project_portfolio_cash_flows(
+        initial_investment, monthly_contribution, tech_allocation,
+        complementary_allocation, investment_duration, risk_tolerance
+    ).yearly()
+    
+    values = {column: getattr(yearly, column) for column in PROJECTION_COLUMNS}
+    values['year'] = yearly.month // MONTHS_PER_YEAR
+    return values
+
 def get_portfolio_projection(user):
-    """Get projection data for the portfolio"""
-    # Get parameters
-    initial_investment = float(user.initial_investment)
-    monthly_contribution = float(user.monthly_contribution)
-    annual_contribution = monthly_contribution * 12
-    years = user.investment_duration
-    risk_level = user.risk_tolerance
-    
-    # Get returns based on risk level
-    tech_return = RISK_RETURNS[risk_level]['tech']
-    complementary_return = RISK_RETURNS[risk_level]['complementary']
-    sp500_return = RISK_RETURNS[risk_level]['sp500']
-    
-    # Calculate weighted portfolio return
-    portfolio_return = (tech_return * user.tech_allocation) + (complementary_return * user.complementary_allocation)
-    
-    # Generate year range
-    years_range = list(range(years + 1))
-    
-    # Initialize projection data
-    portfolio_values = []
-    sp500_values = []
-    initial_plus_contributions = []
-    
-    # Calculate values for each year
-    for year in years_range:
-        # Portfolio value
-        portfolio_value = calculate_future_value(
-            initial_investment,
-            portfolio_return,
-            year,
-            annual_contribution
-        )
-        portfolio_values.append(portfolio_value)
-        
-        # S&P 500 benchmark
-        sp500_value = calculate_future_value(
-            initial_investment,
-            sp500_return,
-            year,
-            annual_contribution
-        )
-        sp500_values.append(sp500_value)
-        
-        # Initial investment plus contributions
-        contributions_value = initial_investment + (annual_contribution * year)
-        initial_plus_contributions.append(contributions_value)
+    """Get projection data for the portfolio (cached, read-only)"""
+    return get_projection_result(user).projection
+
+def _build_portfolio_projection(user):
+    """Build the yearly projection DataFrame for a user"""
+    values = project_portfolio_values(
+        float(user.initial_investment),
+        float(user.monthly_contribution),
+        user.tech_allocation,
+        user.complementary_allocation,
+        user.investment_duration,
+        user.risk_tolerance
+    )
     
     # Create dataframe
     projection_data = pd.DataFrame({
-        'year': years_range,
-        'portfolio_value': portfolio_values,
-        'sp500_benchmark': sp500_values,
-        'initial_plus_contributions': initial_plus_contributions
+        'year': values['year'],
+        **{column: values[column][0] for column in PROJECTION_COLUMNS}
     })
     
     return projection_data
 
-def calculate_alpha(user):
-    """Calculate alpha (outperformance vs S&P 500)"""
-    projection_data = get_portfolio_projection(user)
-    
-    # Calculate yearly alpha
-    alpha_yearly = []
-    alpha_cumulative = []
-    cumulative = 0
-    
-    # Skip first year (year 0) as there's no return yet
-    for i in range(1, len(projection_data)):
-        prev_portfolio = projection_data['portfolio_value'][i-1]
-        curr_portfolio = projection_data['portfolio_value'][i]
-        prev_sp500 = projection_data['sp500_benchmark'][i-1]
-        curr_sp500 = projection_data['sp500_benchmark'][i]
-        
-        # Calculate returns
-        portfolio_return = curr_portfolio / prev_portfolio - 1
-        sp500_return = curr_sp500 / prev_sp500 - 1
-        
-        # Calculate alpha
-        alpha = portfolio_return - sp500_return
-        alpha_yearly.append(alpha)
-        
-        # Add to cumulative alpha
-        cumulative += alpha
-        alpha_cumulative.append(cumulative)
-    
-    # Add 0 for year 0
-    alpha_yearly = [0] + alpha_yearly
-    alpha_cumulative = [0] + alpha_cumulative
+def get_portfolio_projections(users):
+    """
+    Get projection data for many portfolios in one vectorized call
     
-    # Create dataframe
-    alpha_data = pd.DataFrame({
-        'year': projection_data['year'],
-        'alpha_yearly': alpha_yearly,
-        'alpha_cumulative': alpha_cumulative
+    Returns:
+        Long DataFrame with a user_id column and one row per user and year
+    """
+    users = list(users)
+    if not users:
+        return pd.DataFrame(columns=['user_id', 'year', *PROJECTION_COLUMNS])
+    
+    values = project_portfolio_values(
+        [float(user.initial_investment) for user in users],
+        [float(user.monthly_contribution) for user in users],
+        [user.tech_allocation for user in users],
+        [user.complementary_allocation for user in users],
+        [user.investment_duration for user in users],
+        [user.risk_tolerance for user in users]
+    )
+    
+    years = values['year']
+    projection_data = pd.DataFrame({
+        'user_id': np.repeat([user.id for user in users], len(years)),
+        'year': np.tile(years, len(users)),
+        **{column: values[column].ravel() for column in PROJECTION_COLUMNS}
     })
     
-    return alpha_data
+    # Drop the padding beyond each user's duration
+    return projection_data.dropna(subset=['portfolio_value']).reset_index(drop=True)
+
+def calculate_alpha(user):
+    """Calculate alpha (outperformance vs S&P 500) (cached, read-only)"""
+    return get_projection_result(user).alpha
+
+def _calculate_alpha_from_projection(projection_data):
+    """Calculate yearly and cumulative alpha and benchmark-relative analytics from a projection DataFrame"""
+    metrics = compute_alpha_metrics(projection_data['portfolio_value'], projection_data['sp500_benchmark'])
+    return alpha_frame(projection_data['year'].to_numpy(), metrics), alpha_summary(metrics)
+
+class ProjectionResult:
+    """Projection, alpha and summary metrics derived from a single computation"""
+    
+    __slots__ = ('projection', 'alpha', 'final_value', 'total_contributions', 'total_profit', 'cagr',
+                 'final_alpha', 'tracking_error', 'information_ratio', 'target_hit_rate')
+    
+    def __init__(self, projection, alpha, alpha_metrics, initial_investment, investment_duration):
+        self.projection = projection
+        self.alpha = alpha
+        self.final_value = float(projection['portfolio_value'].iloc[-1])
+        self.total_contributions = float(projection['initial_plus_contributions'].iloc[-1])
+        self.total_profit = self.final_value - self.total_contributions
+        self.cagr = calculate_cagr(initial_investment, self.final_value, investment_duration)
+        self.final_alpha = alpha_metrics['final_alpha']
+        self.tracking_error = alpha_metrics['tracking_error']
+        self.information_ratio = alpha_metrics['information_ratio']
+        self.target_hit_rate = alpha_metrics['target_hit_rate']
+
+# Results keyed by a hash of the projection inputs, plus each user's current key for invalidation
+projection_cache = LRUCache(
+    max_entries=config.PROJECTION_CACHE_MAX_ENTRIES,
+    size_of=lambda result: estimate_size(result.projection) + estimate_size(result.alpha)
+)
+_projection_keys_by_user = {}
+_projection_keys_lock = threading.Lock()
+
+def projection_cache_key(user):
+    """Hash the inputs that determine a user's projection"""
+    inputs = (
+        float(user.initial_investment),
+        float(user.monthly_contribution),
+        round(float(user.tech_allocation), 6),
+        round(float(user.complementary_allocation), 6),
+        int(user.investment_duration),
+        user.risk_tolerance
+    )
+    return hashlib.sha256(repr(inputs).encode('utf-8')).hexdigest()
+
+def get_projection_result(user):
+    """Get the projection, alpha and summary metrics for a user, computed once per set of inputs"""
+    key = projection_cache_key(user)
+    if getattr(user, 'id', None) is not None:
+        with _projection_keys_lock:
+            _projection_keys_by_user[user.id] = key
+    
+    def compute():
+        projection = _build_portfolio_projection(user)
+        alpha, alpha_metrics = _calculate_alpha_from_projection(projection)
+        return ProjectionResult(projection, alpha, alpha_metrics, float(user.initial_investment), user.investment_duration)
+    
+    return projection_cache.get_or_create(key, compute)
+
+def invalidate_projection_cache(user_id):
+    """Drop the cached projection for a user's current inputs, e.g. before they change"""
+    with _projection_keys_lock:
+        key = _projection_keys_by_user.pop(user_id, None)
+    if key is not None:
+        projection_cache.invalidate(key)
+
+# Percentiles reported by the Monte Carlo projection
+MONTE_CARLO_PERCENTILES = (5, 25, 50, 75, 95)
+
+def _sleeve_parameters(risk_level):
+    """Get the monthly log drift and the Cholesky factor of the monthly sleeve covariance"""
+    annual_returns = np.array([RISK_RETURNS[risk_level][sleeve] for sleeve in SIMULATION_SLEEVES])
+    annual_volatility = np.array([RISK_VOLATILITY[risk_level][sleeve] for sleeve in SIMULATION_SLEEVES])
+    
+    # Lognormal monthly returns whose mean compounds to the annual return
+    monthly_volatility = annual_volatility / np.sqrt(12)
+    drift = np.log1p(annual_returns) / 12 - monthly_volatility ** 2 / 2
+    covariance = np.outer(monthly_volatility, monthly_volatility) * np.asarray(SLEEVE_CORRELATION)
+    
+    return drift, np.linalg.cholesky(covariance)
+
+def _simulate_path_chunk(seed_sequence, paths, months, initial_investment, monthly_contribution,
+                         tech_allocation, complementary_allocation, drift, cholesky, sample_every=12):
+    """
+    Simulate one chunk of paths for the portfolio and the S&P 500
+    
+    Returns:
+        Tuple of (portfolio, benchmark) arrays of shape (paths, samples), sampled
+        every sample_every months and starting with the initial investment
+    """
+    generator = np.random.Generator(np.random.PCG64(seed_sequence))
+    
+    # Correlated monthly growth factors, shape (paths, months, sleeves)
+    shocks = generator.standard_normal((paths, months, len(SIMULATION_SLEEVES)))
+    growth = np.exp(drift + shocks @ cholesky.T)
+    del shocks
+    
+    # The portfolio is rebalanced to its sleeve allocation every month
+    sleeves = {
+        'portfolio': growth[..., 0] * tech_allocation + growth[..., 1] * complementary_allocation,
+        'benchmark': growth[..., 2]
+    }
+    del growth
+    
+    # V_m = V_{m-1} * g_m + c, in closed form: V_m = G_m * (V_0 + c * sum_{j<=m} 1 / G_j)
+    samples = {}
+    for name, monthly_growth in sleeves.items():
+        cumulative_growth = np.cumprod(monthly_growth, axis=1)
+        values = cumulative_growth * (initial_investment + monthly_contribution * np.cumsum(1 / cumulative_growth, axis=1))
+        samples[name] = np.hstack([
+            np.full((paths, 1), initial_investment),
+            values[:, sample_every - 1::sample_every]
+        ])
+    
+    return samples['portfolio'], samples['benchmark']
+
+def _iter_path_chunks(user, paths, months, workers, sample_every=12, purpose='monte_carlo',
+                      chunk_function=_simulate_path_chunk, extra_arguments=()):
+    """
+    Run the simulation in memory-bounded chunks, optionally across a process pool
+    
+    chunk_function receives the _simulate_path_chunk arguments followed by
+    extra_arguments, and its results are yielded in chunk order.
+    """
+    drift, cholesky = _sleeve_parameters(user.risk_tolerance)
+    
+    # Chunk so each chunk draws at most MONTE_CARLO_CHUNK_ELEMENTS normals
+    chunk_paths = max(1, config.MONTE_CARLO_CHUNK_ELEMENTS // (months * len(SIMULATION_SLEEVES)))
+    chunk_sizes = [min(chunk_paths, paths - start) for start in range(0, paths, chunk_paths)]
+    seed_sequences = spawn_seed_sequences(user.risk_tolerance, purpose, count=len(chunk_sizes))
+    
+    arguments = [
+        (
+            seed_sequence, chunk_size, months, float(user.initial_investment), float(user.monthly_contribution),
+            user.tech_allocation, user.complementary_allocation, drift, cholesky, sample_every, *extra_arguments
+        )
+        for seed_sequence, chunk_size in zip(seed_sequences, chunk_sizes)
+    ]
+    
+    if workers and len(arguments) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(chunk_function, *zip(*arguments))
+    else:
+        for chunk_arguments in arguments:
+            yield chunk_function(*chunk_arguments)
+
+def simulate_portfolio_projection(user, paths=None, workers=None):
+    """
+    Get Monte Carlo percentile bands for the portfolio and the S&P 500 benchmark
+    
+    Args:
+        user: User whose investment, contributions, allocation, duration and risk are simulated
+        paths: Number of simulated paths (defaults to config.MONTE_CARLO_PATHS)
+        workers: Worker processes to spread the chunks over (defaults to config.MONTE_CARLO_WORKERS)
+    
+    Returns:
+        DataFrame with a year column and portfolio_p<q> / sp500_p<q> columns
+        for every q in MONTE_CARLO_PERCENTILES
+    """
+    paths = paths or config.MONTE_CARLO_PATHS
+    workers = config.MONTE_CARLO_WORKERS if workers is None else workers
+    months = user.investment_duration * 12
+    
+    # Only the yearly samples of each chunk are kept
+    portfolio_chunks = []
+    benchmark_chunks = []
+    for portfolio, benchmark in _iter_path_chunks(user, paths, months, workers):
+        portfolio_chunks.append(portfolio)
+        benchmark_chunks.append(benchmark)
+    
+    portfolio_bands = np.percentile(np.vstack(portfolio_chunks), MONTE_CARLO_PERCENTILES, axis=0)
+    benchmark_bands = np.percentile(np.vstack(benchmark_chunks), MONTE_CARLO_PERCENTILES, axis=0)
+    
+    bands = {'year': np.arange(user.investment_duration + 1)}
+    for i, percentile in enumerate(MONTE_CARLO_PERCENTILES):
+        bands[f'portfolio_p{percentile}'] = portfolio_bands[i]
+    for i, percentile in enumerate(MONTE_CARLO_PERCENTILES):
+        bands[f'sp500_p{percentile}'] = benchmark_bands[i]
+    
+    return pd.DataFrame(bands)
+
+def _sketch_path_chunk(*arguments):
+    """
+    Simulate one chunk and reduce it to quantile sketches and shortfall counts
+    
+    Takes the _simulate_path_chunk arguments followed by the relative accuracy
+    and the contribution targets, so only the small sketches leave the worker.
+    """
+    *simulation_arguments, relative_accuracy, contribution_targets = arguments
+    portfolio, benchmark = _simulate_path_chunk(*simulation_arguments)
+    
+    portfolio_sketch = LogBucketSketch(portfolio.shape[1], relative_accuracy)
+    portfolio_sketch.add(portfolio)
+    benchmark_sketch = LogBucketSketch(benchmark.shape[1], relative_accuracy)
+    benchmark_sketch.add(benchmark)
+    
+    # Exact counts of paths below the contributions and below the benchmark
+    shortfalls = (portfolio < contribution_targets).sum(axis=0)
+    underperformance = (portfolio < benchmark).sum(axis=0)
+    
+    return portfolio_sketch, benchmark_sketch, shortfalls, underperformance
+
+def simulate_portfolio_projection_streaming(user, paths=1_000_000, workers=None, sample_every=12,
+                                            relative_accuracy=0.005):
+    """
+    Get Monte Carlo percentile bands in constant memory, for very large simulations
+    
+    Paths are generated in chunks and folded into mergeable quantile sketches
+    per time step, so memory depends on the number of steps rather than the
+    number of paths. Per-worker sketches are merged when workers are used.
+    
+    Args:
+        user: User whose investment, contributions, allocation, duration and risk are simulated
+        paths: Number of simulated paths
+        workers: Worker processes to spread the chunks over (defaults to config.MONTE_CARLO_WORKERS)
+        sample_every: Months between reported steps (12 for yearly, 1 for monthly)
+        relative_accuracy: Relative error bound of the percentile estimates
+    
+    Returns:
+        DataFrame with a year column, the same percentile columns as
+        simulate_portfolio_projection, and the probabilities of ending a step
+        below the contributions (shortfall_probability) or below the S&P 500
+        (underperformance_probability)
+    """
+    workers = config.MONTE_CARLO_WORKERS if workers is None else workers
+    months = user.investment_duration * 12
+    steps = np.arange(0, months + 1, sample_every)
+    contribution_targets = float(user.initial_investment) + float(user.monthly_contribution) * steps
+    
+    portfolio_sketch = benchmark_sketch = None
+    shortfalls = np.zeros(len(steps), dtype=np.int64)
+    underperformance = np.zeros(len(steps), dtype=np.int64)
+    
+    chunks = _iter_path_chunks(
+        user, paths, months, workers, sample_every,
+        chunk_function=_sketch_path_chunk,
+        extra_arguments=(relative_accuracy, contribution_targets)
+    )
+    for chunk_portfolio, chunk_benchmark, chunk_shortfalls, chunk_underperformance in chunks:
+        if portfolio_sketch is None:
+            portfolio_sketch, benchmark_sketch = chunk_portfolio, chunk_benchmark
+        else:
+            portfolio_sketch.merge(chunk_portfolio)
+            benchmark_sketch.merge(chunk_benchmark)
+        shortfalls += chunk_shortfalls
+        underperformance += chunk_underperformance
+    
+    quantiles = np.asarray(MONTE_CARLO_PERCENTILES) / 100
+    portfolio_bands = portfolio_sketch.quantiles(quantiles)
+    benchmark_bands = benchmark_sketch.quantiles(quantiles)
+    
+    bands = {'year': steps / 12 if sample_every % 12 else steps // 12}
+    for i, percentile in enumerate(MONTE_CARLO_PERCENTILES):
+        bands[f'portfolio_p{percentile}'] = portfolio_bands[i]
+    for i, percentile in enumerate(MONTE_CARLO_PERCENTILES):
+        bands[f'sp500_p{percentile}'] = benchmark_bands[i]
+    bands['shortfall_probability'] = shortfalls / paths
+    bands['underperformance_probability'] = underperformance / paths
+    
+    return pd.DataFrame(bands)
+
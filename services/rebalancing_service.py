@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+from services.etf_service import get_etf_catalog
+from services.portfolio_service import calculate_etf_allocations
+import config
+
+# Columns of the generated trade list and the per-portfolio summary
+TRADE_COLUMNS = ['user_id', 'symbol', 'category', 'action', 'reason', 'value', 'units', 'price']
+SUMMARY_COLUMNS = ['user_id', 'portfolio_value', 'contribution', 'tech_weight', 'max_drift',
+                   'in_mandate', 'drift_breached', 'action']
+
+# Summary action per plan action code; 'unpriced' portfolios hold or target an ETF
+# without a known price, so they can be neither valued nor traded
+ACTIONS = ['none', 'contribution', 'rebalance', 'unpriced']
+
+def plan_rebalance(values, target_weights, contributions, tech_columns, threshold=None):
+    """
+    Plan contribution-first rebalancing for a batch of portfolios
+
+    Contributions are spent on the most underweight positions first. A full
+    rebalance to the target weights is only planned if a weight still
+    drifts past the threshold or the tech sleeve is outside the mandate.
+
+    Args:
+        values: Current market value per (portfolio, ETF), shape (portfolios, etfs)
+        target_weights: Target weight per (portfolio, ETF), each row summing to 1
+        contributions: Cash to invest per portfolio, shape (portfolios,)
+        tech_columns: Boolean mask of the tech ETFs, shape (etfs,)
+        threshold: Largest tolerated absolute weight drift (defaults to config.REBALANCE_DRIFT_THRESHOLD)
+
+    Returns:
+        Tuple of (trade values, shape (portfolios, etfs), positive for buys, and a
+        dictionary of per-portfolio arrays: tech_weight, max_drift, in_mandate,
+        drift_breached and action, where action indexes ACTIONS)
+    """
+    if threshold is None:
+        threshold = config.REBALANCE_DRIFT_THRESHOLD
+
+    values = np.asarray(values, dtype=np.float64)
+    target_weights = np.asarray(target_weights, dtype=np.float64)
+    contributions = np.asarray(contributions, dtype=np.float64)
+    totals = values.sum(axis=1)
+    invested = totals + contributions
+
+    def out_of_bounds(holdings):
+        held = holdings.sum(axis=1, keepdims=True)
+        weights = np.divide(holdings, held, out=np.zeros_like(holdings), where=held > 0)
+        drift = np.abs(weights - target_weights).max(axis=1)
+        tech_weight = weights[:, tech_columns].sum(axis=1)
+        in_mandate = (tech_weight >= config.MIN_TECH_ALLOCATION - 1e-9) & (tech_weight <= config.MAX_TECH_ALLOCATION + 1e-9)
+        return tech_weight, drift, in_mandate, drift > threshold
+
+    tech_weight, max_drift, in_mandate, drift_breached = out_of_bounds(values)
+
+    # Contributions fill the shortfalls against the post-contribution targets, pro rata;
+    # anything left over once every position is at target buys at the target weights
+    shortfalls = np.maximum(target_weights * invested[:, np.newaxis] - values, 0)
+    shortfall_totals = shortfalls.sum(axis=1)
+    fill = np.divide(contributions, shortfall_totals, out=np.zeros_like(contributions), where=shortfall_totals > 0)
+    buys = shortfalls * np.minimum(fill, 1)[:, np.newaxis]
+    leftover = contributions - buys.sum(axis=1)
+    buys += target_weights * leftover[:, np.newaxis]
+
+    # Full rebalance only where the contribution alone does not restore the bounds
+    _, drift_after, in_mandate_after, breached_after = out_of_bounds(values + buys)
+    needs_rebalance = breached_after | ~in_mandate_after
+    rebalance_trades = target_weights * invested[:, np.newaxis] - values
+    trades = np.where(needs_rebalance[:, np.newaxis], rebalance_trades, buys)
+
+    action = np.where(needs_rebalance, 2, np.where(contributions > 0, 1, 0))
+    return trades, {
+        'tech_weight': tech_weight,
+        'max_drift': max_drift,
+        'in_mandate': in_mandate,
+        'drift_breached': drift_breached,
+        'action': action
+    }
+
+def _mark_unpriced(trades, plan, units, weights, priced):
+    """Void the plans of portfolios that hold or target an unpriced ETF"""
+    unpriced = ((units[:, ~priced] != 0) | (weights[:, ~priced] > 0)).any(axis=1)
+    if unpriced.any():
+        trades[unpriced] = 0.0
+        plan['tech_weight'][unpriced] = np.nan
+        plan['max_drift'][unpriced] = np.nan
+        plan['in_mandate'][unpriced] = False
+        plan['drift_breached'][unpriced] = False
+        plan['action'][unpriced] = ACTIONS.index('unpriced')
+    return trades, plan
+
+def _trade_list(user_ids, symbols, categories, trades, prices, action, minimum_trade=0.01):
+    """Turn a (portfolios x ETFs) trade matrix into one row per non-trivial trade"""
+    rows, columns = np.nonzero(np.abs(trades) >= minimum_trade)
+    values = trades[rows, columns]
+    return pd.DataFrame({
+        'user_id': np.asarray(user_ids)[rows],
+        'symbol': np.asarray(symbols)[columns],
+        'category': np.asarray(categories)[columns],
+        'action': np.where(values > 0, 'buy', 'sell'),
+        'reason': np.where(action[rows] == 2, 'rebalance', 'contribution'),
+        'value': values,
+        'units': values / prices[columns],
+        'price': prices[columns]
+    }, columns=TRADE_COLUMNS)
+
+def _summary(user_ids, values, contributions, plan):
+    """Build the per-portfolio summary DataFrame"""
+    return pd.DataFrame({
+        'user_id': user_ids,
+        'portfolio_value': values.sum(axis=1),
+        'contribution': contributions,
+        'tech_weight': plan['tech_weight'],
+        'max_drift': plan['max_drift'],
+        'in_mandate': plan['in_mandate'],
+        'drift_breached': plan['drift_breached'],
+        'action': np.array(ACTIONS)[plan['action']]
+    }, columns=SUMMARY_COLUMNS)
+
+def check_rebalance(user, contribution=None, threshold=None):
+    """
+    Check one portfolio's drift and plan its trades
+
+    Args:
+        user: User with recorded holdings
+        contribution: Cash to invest first (defaults to the monthly contribution)
+        threshold: Largest tolerated absolute weight drift
+
+    Returns:
+        Tuple of (trade list DataFrame, summary DataFrame with one row)
+    """
+    from database.db_service import get_user_holdings
+    from services.valuation_service import get_latest_prices
+
+    allocations = calculate_etf_allocations(user)
+    if not allocations:
+        return pd.DataFrame(columns=TRADE_COLUMNS), pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    if contribution is None:
+        contribution = user.monthly_contribution
+    symbols = [etf['symbol'] for etf in allocations]
+    categories = [etf['category'] for etf in allocations]
+    values = np.array([[etf['value'] for etf in allocations]])
+    weights = np.array([[etf['allocation'] for etf in allocations]])
+    weights /= weights.sum()
+    contributions = np.array([float(contribution)])
+    prices = get_latest_prices(symbols)
+    priced = np.isfinite(prices) & (prices > 0)
+
+    # Holdings outside the targets count too: one without a price leaves the portfolio unpriced
+    if user.id is not None:
+        holdings = get_user_holdings(user.id)
+        stray = holdings[~holdings['symbol'].isin(symbols) & (holdings['units'] != 0)]
+        stray_prices = get_latest_prices(stray['symbol'])
+        if not (np.isfinite(stray_prices) & (stray_prices > 0)).all():
+            priced[:] = False
+
+    trades, plan = plan_rebalance(values, weights, contributions, np.array(categories) == 'Tech ETFs', threshold)
+    trades, plan = _mark_unpriced(trades, plan, values, weights, priced)
+    return (
+        _trade_list([user.id], symbols, categories, trades, prices, plan['action']),
+        _summary([user.id], values, contributions, plan)
+    )
+
+def check_all_rebalances(threshold=None, batch_size=None, include_contributions=True):
+    """
+    Check every portfolio with recorded holdings and generate the trade list
+
+    Targets come from the association tables' allocation_percentage, values
+    from the holdings at the latest prices, and portfolios are planned in
+    vectorized batches of batch_size; only one batch's dense matrices are
+    held at a time. Portfolios holding or targeting an ETF without a price
+    are reported with the 'unpriced' action and get no trades.
+
+    Returns:
+        Tuple of (trade list DataFrame, summary DataFrame with one row per portfolio)
+    """
+    from database.db_service import get_etf_allocation_entries, get_holdings_by_user
+    from services.valuation_service import get_latest_prices
+
+    if batch_size is None:
+        batch_size = config.REBALANCE_BATCH_SIZE
+
+    holdings = get_holdings_by_user().dropna(subset=['symbol'])
+    targets = get_etf_allocation_entries()
+    if holdings.empty or targets.empty:
+        return pd.DataFrame(columns=TRADE_COLUMNS), pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    # Only portfolios with both targets and holdings can be checked
+    user_ids = np.intersect1d(holdings['user_id'].unique(), targets['user_id'].unique())
+    holdings = holdings[holdings['user_id'].isin(user_ids)]
+    targets = targets[targets['user_id'].isin(user_ids)]
+
+    symbols = np.union1d(holdings['symbol'].unique(), targets['symbol'].unique())
+    catalog = get_etf_catalog()
+    categories = np.array([catalog.get(symbol).category if catalog.get(symbol) else 'Unknown' for symbol in symbols])
+    prices = get_latest_prices(symbols)
+    priced = np.isfinite(prices) & (prices > 0)
+    safe_prices = np.where(priced, prices, 0.0)
+
+    # Sort the rows by portfolio so each batch is one contiguous slice of them
+    user_index = pd.Index(user_ids)
+    symbol_index = pd.Index(symbols)
+    holding_users = user_index.get_indexer(holdings['user_id'])
+    holding_order = np.argsort(holding_users, kind='stable')
+    holding_users = holding_users[holding_order]
+    holding_symbols = symbol_index.get_indexer(holdings['symbol'])[holding_order]
+    holding_units = holdings['units'].to_numpy(dtype=np.float64)[holding_order]
+    target_users = user_index.get_indexer(targets['user_id'])
+    target_order = np.argsort(target_users, kind='stable')
+    target_users = target_users[target_order]
+    target_symbols = symbol_index.get_indexer(targets['symbol'])[target_order]
+    target_weights = targets['allocation'].fillna(0.0).to_numpy(dtype=np.float64)[target_order]
+
+    contributions = np.zeros(len(user_ids))
+    if include_contributions:
+        monthly = holdings.drop_duplicates('user_id').set_index('user_id')['monthly_contribution']
+        contributions = monthly.reindex(user_ids).fillna(0.0).to_numpy(dtype=np.float64)
+
+    trade_lists = []
+    summaries = []
+    tech_columns = categories == 'Tech ETFs'
+    for start in range(0, len(user_ids), batch_size):
+        stop = min(start + batch_size, len(user_ids))
+        batch = slice(start, stop)
+
+        # Dense (batch portfolios x ETFs) matrices, scatter-added from this batch's rows only
+        units = np.zeros((stop - start, len(symbols)))
+        rows = slice(*np.searchsorted(holding_users, [start, stop]))
+        np.add.at(units, (holding_users[rows] - start, holding_symbols[rows]), holding_units[rows])
+        weights = np.zeros_like(units)
+        rows = slice(*np.searchsorted(target_users, [start, stop]))
+        np.add.at(weights, (target_users[rows] - start, target_symbols[rows]), target_weights[rows])
+        weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+
+        values = units * safe_prices
+        trades, plan = plan_rebalance(values, weights, contributions[batch], tech_columns, threshold)
+        trades, plan = _mark_unpriced(trades, plan, units, weights, priced)
+        trade_lists.append(_trade_list(user_ids[batch], symbols, categories, trades, prices, plan['action']))
+        summaries.append(_summary(user_ids[batch], values, contributions[batch], plan))
+
+    return pd.concat(trade_lists, ignore_index=True), pd.concat(summaries, ignore_index=True)
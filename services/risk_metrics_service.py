@@ -0,0 +1,215 @@
+from datetime import date, datetime, time, timedelta
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from services.etf_service import get_price_store
+from data.etf_data import DAYS_PER_YEAR
+import config
+
+# Default confidence level for VaR and CVaR
+DEFAULT_CONFIDENCE = 0.95
+
+def _as_matrix(values):
+    """View a series or (dates x portfolios) matrix as a 2-D float array"""
+    values = np.asarray(values, dtype=np.float64)
+    return values[:, np.newaxis] if values.ndim == 1 else values
+
+def returns_from_values(values):
+    """Get period returns, shape (dates - 1, portfolios), from a value matrix"""
+    values = _as_matrix(values)
+    return values[1:] / values[:-1] - 1
+
+def value_at_risk(returns, confidence=DEFAULT_CONFIDENCE, method='historical'):
+    """
+    Value at risk per portfolio, as a positive fraction of value lost over one period
+
+    Args:
+        returns: Period returns, shape (dates,) or (dates, portfolios)
+        confidence: Confidence level, e.g. 0.95
+        method: 'historical' (empirical quantile) or 'parametric' (normal)
+    """
+    returns = _as_matrix(returns)
+    if method == 'parametric':
+        z = NormalDist().inv_cdf(1 - confidence)
+        return -(returns.mean(axis=0) + z * returns.std(axis=0, ddof=1))
+    return -np.quantile(returns, 1 - confidence, axis=0)
+
+def conditional_value_at_risk(returns, confidence=DEFAULT_CONFIDENCE, method='historical'):
+    """Expected loss beyond the VaR per portfolio (expected shortfall), as a positive fraction"""
+    returns = _as_matrix(returns)
+    if method == 'parametric':
+        z = NormalDist().inv_cdf(1 - confidence)
+        tail = NormalDist().pdf(z) / (1 - confidence)
+        return -(returns.mean(axis=0) - tail * returns.std(axis=0, ddof=1))
+
+    # Mean of the returns at or below the VaR quantile, for every column at once
+    cutoff = np.quantile(returns, 1 - confidence, axis=0)
+    in_tail = returns <= cutoff
+    return -(np.where(in_tail, returns, 0).sum(axis=0) / np.maximum(in_tail.sum(axis=0), 1))
+
+def drawdowns(values):
+    """Drawdown from the running peak at every date, shape (dates, portfolios), as negative fractions"""
+    values = _as_matrix(values)
+    return values / np.maximum.accumulate(values, axis=0) - 1
+
+def max_drawdown(values):
+    """
+    Deepest drawdown and longest time under water per portfolio
+
+    Returns:
+        Tuple of (max drawdown as a positive fraction, longest duration in periods)
+    """
+    drawdown = drawdowns(values)
+
+    # Periods since the last peak: position minus the running position of the latest peak
+    positions = np.arange(len(drawdown))[:, np.newaxis]
+    last_peak = np.maximum.accumulate(np.where(drawdown >= 0, positions, 0), axis=0)
+    return -drawdown.min(axis=0), (positions - last_peak).max(axis=0)
+
+def sharpe_ratio(returns, periods_per_year=DAYS_PER_YEAR, risk_free_rate=None):
+    """Annualized Sharpe ratio per portfolio"""
+    if risk_free_rate is None:
+        risk_free_rate = config.RISK_FREE_RATE
+    excess = _as_matrix(returns) - risk_free_rate / periods_per_year
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return excess.mean(axis=0) / excess.std(axis=0, ddof=1) * np.sqrt(periods_per_year)
+
+def sortino_ratio(returns, periods_per_year=DAYS_PER_YEAR, risk_free_rate=None):
+    """Annualized Sortino ratio per portfolio (downside deviation below the risk-free rate)"""
+    if risk_free_rate is None:
+        risk_free_rate = config.RISK_FREE_RATE
+    excess = _as_matrix(returns) - risk_free_rate / periods_per_year
+    downside = np.sqrt((np.minimum(excess, 0) ** 2).mean(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return excess.mean(axis=0) / downside * np.sqrt(periods_per_year)
+
+def _rolling_sums(values, window):
+    """Sums over every trailing window from one cumulative sum, shape (dates - window + 1, portfolios)"""
+    cumulative = np.cumsum(values, axis=0)
+    sums = cumulative[window - 1:].copy()
+    sums[1:] -= cumulative[:-window]
+    return sums
+
+def rolling_mean_std(returns, window):
+    """Trailing-window mean and sample standard deviation of returns in O(n)"""
+    returns = _as_matrix(returns)
+    mean = _rolling_sums(returns, window) / window
+
+    # Shift by the first return before squaring to limit cancellation
+    centered = returns - returns[:1]
+    shifted_mean = _rolling_sums(centered, window) / window
+    variance = (_rolling_sums(centered ** 2, window) / window - shifted_mean ** 2) * window / (window - 1)
+    return mean, np.sqrt(np.maximum(variance, 0))
+
+def rolling_sharpe_ratio(returns, window, periods_per_year=DAYS_PER_YEAR, risk_free_rate=None):
+    """Annualized Sharpe ratio over every trailing window"""
+    if risk_free_rate is None:
+        risk_free_rate = config.RISK_FREE_RATE
+    mean, std = rolling_mean_std(returns, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (mean - risk_free_rate / periods_per_year) / std * np.sqrt(periods_per_year)
+
+def rolling_sortino_ratio(returns, window, periods_per_year=DAYS_PER_YEAR, risk_free_rate=None):
+    """Annualized Sortino ratio over every trailing window"""
+    if risk_free_rate is None:
+        risk_free_rate = config.RISK_FREE_RATE
+    excess = _as_matrix(returns) - risk_free_rate / periods_per_year
+    mean = _rolling_sums(excess, window) / window
+    downside = np.sqrt(_rolling_sums(np.minimum(excess, 0) ** 2, window) / window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return mean / downside * np.sqrt(periods_per_year)
+
+def rolling_parametric_var(returns, window, confidence=DEFAULT_CONFIDENCE):
+    """Parametric (normal) VaR over every trailing window, as positive fractions"""
+    mean, std = rolling_mean_std(returns, window)
+    return -(mean + NormalDist().inv_cdf(1 - confidence) * std)
+
+def compute_risk_metrics(values, names=None, periods_per_year=DAYS_PER_YEAR, confidence=DEFAULT_CONFIDENCE):
+    """
+    Compute every risk metric for a (dates x portfolios) value matrix in one pass
+
+    Args:
+        values: Values per date, shape (dates,) or (dates, portfolios)
+        names: Optional label per portfolio
+        periods_per_year: Periods per year, used to annualize (price store rows are calendar days)
+        confidence: Confidence level for VaR and CVaR
+
+    Returns:
+        DataFrame with one row per portfolio
+    """
+    values = _as_matrix(values)
+    returns = returns_from_values(values)
+    depth, duration = max_drawdown(values)
+
+    metrics = pd.DataFrame({
+        'annual_return': (values[-1] / values[0]) ** (periods_per_year / max(len(returns), 1)) - 1,
+        'volatility': returns.std(axis=0, ddof=1) * np.sqrt(periods_per_year),
+        'var_historical': value_at_risk(returns, confidence),
+        'cvar_historical': conditional_value_at_risk(returns, confidence),
+        'var_parametric': value_at_risk(returns, confidence, 'parametric'),
+        'cvar_parametric': conditional_value_at_risk(returns, confidence, 'parametric'),
+        'max_drawdown': depth,
+        'max_drawdown_duration': duration,
+        'sharpe_ratio': sharpe_ratio(returns, periods_per_year),
+        'sortino_ratio': sortino_ratio(returns, periods_per_year)
+    })
+    if names is not None:
+        metrics.insert(0, 'name', list(names))
+    return metrics
+
+def _read_prices(symbols, years, as_of):
+    """Read daily prices for some symbols from the price store"""
+    if as_of is None:
+        as_of = date.today()
+    end_date = datetime.combine(as_of, time())
+    return get_price_store(as_of).read(list(symbols), end_date - timedelta(days=years * DAYS_PER_YEAR), end_date)
+
+def get_etf_risk_metrics(symbols, years=5, as_of=None, confidence=DEFAULT_CONFIDENCE):
+    """Get risk metrics for each ETF from its daily history"""
+    _, prices = _read_prices(symbols, years, as_of)
+    return compute_risk_metrics(prices, names=symbols, confidence=confidence)
+
+def get_portfolio_risk_metrics(users, years=5, as_of=None, confidence=DEFAULT_CONFIDENCE, allocations=None):
+    """
+    Get risk metrics for many users' portfolios in one pass
+
+    Each portfolio is held at its ETF allocations, rebalanced daily, so the
+    (dates x users) value matrix is one product of the ETF returns with the
+    (ETFs x users) weight matrix.
+
+    Args:
+        users: Users to evaluate
+        years: Years of daily history
+        as_of: Date of the last price
+        confidence: Confidence level for VaR and CVaR
+        allocations: Each user's calculate_etf_allocations output, if already computed
+
+    Returns:
+        DataFrame with a user_id column and one row per user with ETFs
+    """
+    from services.portfolio_service import calculate_etf_allocations
+
+    users = list(users)
+    if allocations is None:
+        allocations = [calculate_etf_allocations(user) for user in users]
+    allocations = list(allocations)
+    users = [user for user, etfs in zip(users, allocations) if etfs]
+    allocations = [etfs for etfs in allocations if etfs]
+    if not users:
+        return pd.DataFrame(columns=['user_id'])
+
+    symbols = sorted({etf['symbol'] for etfs in allocations for etf in etfs})
+    columns = {symbol: i for i, symbol in enumerate(symbols)}
+    weights = np.zeros((len(symbols), len(users)))
+    for row, etfs in enumerate(allocations):
+        for etf in etfs:
+            weights[columns[etf['symbol']], row] += etf['allocation']
+    weights /= weights.sum(axis=0)
+
+    _, prices = _read_prices(symbols, years, as_of)
+    portfolio_returns = returns_from_values(prices) @ weights
+    values = np.vstack([np.ones(len(users)), np.cumprod(1 + portfolio_returns, axis=0)])
+
+    metrics = compute_risk_metrics(values, confidence=confidence)
+    metrics.insert(0, 'user_id', [user.id for user in users])
+    return metrics
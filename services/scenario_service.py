@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from utils.constants import RISK_LEVELS
+from utils.cache import LRUCache
+from services.projection_service import project_portfolio_values
+from services.alpha_service import compute_alpha_metrics
+import config
+
+# Tech allocation steps swept by default (60% to 80% in 1% steps)
+SCENARIO_ALLOCATION_STEPS = 21
+
+# Metrics available on a scenario surface
+SCENARIO_METRICS = ('portfolio_value', 'sp500_benchmark', 'total_profit', 'cagr', 'alpha_cumulative')
+
+class ScenarioGrid:
+    """
+    Projection metrics over every (tech allocation, risk level, horizon) combination
+
+    Each metric is an array of shape (allocations, risk levels, horizons),
+    so browsing the grid is plain indexing.
+    """
+
+    __slots__ = ('tech_allocations', 'risk_levels', 'horizons', 'metrics')
+
+    def __init__(self, tech_allocations, risk_levels, horizons, metrics):
+        self.tech_allocations = tech_allocations
+        self.risk_levels = risk_levels
+        self.horizons = horizons
+        self.metrics = metrics
+
+    def surface(self, metric, risk_tolerance):
+        """Get a (allocations, horizons) slice of a metric for one risk level"""
+        return self.metrics[metric][:, self.risk_levels.index(risk_tolerance), :]
+
+    def lookup(self, tech_allocation, risk_tolerance, investment_duration):
+        """Get every metric for the grid point nearest to a set of inputs"""
+        row = int(np.abs(self.tech_allocations - tech_allocation).argmin())
+        column = self.risk_levels.index(risk_tolerance)
+        horizon = int(np.clip(investment_duration, self.horizons[0], self.horizons[-1])) - self.horizons[0]
+        return {metric: float(values[row, column, horizon]) for metric, values in self.metrics.items()}
+
+    def to_frame(self):
+        """Get the grid as a long DataFrame with one row per scenario"""
+        allocations, risks, horizons = np.meshgrid(
+            self.tech_allocations, np.asarray(self.risk_levels), self.horizons, indexing='ij'
+        )
+        return pd.DataFrame({
+            'tech_allocation': allocations.ravel(),
+            'risk_tolerance': risks.ravel(),
+            'investment_duration': horizons.ravel(),
+            **{metric: values.ravel() for metric, values in self.metrics.items()}
+        })
+
+# Grids keyed by their inputs; a grid is a few hundred KB at most
+scenario_cache = LRUCache(max_entries=64)
+
+def _build_scenario_grid(initial_investment, monthly_contribution, max_horizon, steps):
+    """Evaluate every scenario with one broadcasted projection"""
+    tech_allocations = np.linspace(config.MIN_TECH_ALLOCATION, config.MAX_TECH_ALLOCATION, steps)
+    risk_levels = list(RISK_LEVELS)
+
+    # One portfolio per (allocation, risk level); the value at year h of a
+    # max_horizon projection is the value of an h-year projection
+    tech = np.repeat(tech_allocations, len(risk_levels))
+    risk = np.tile(risk_levels, steps)
+    values = project_portfolio_values(
+        initial_investment, monthly_contribution, tech, 1 - tech, max_horizon, risk
+    )
+    alpha = compute_alpha_metrics(values['portfolio_value'], values['sp500_benchmark'])
+
+    # Drop year 0 and reshape to (allocations, risk levels, horizons)
+    shape = (steps, len(risk_levels), max_horizon)
+    horizons = values['year'][1:]
+    portfolio_value = values['portfolio_value'][:, 1:].reshape(shape)
+    contributions = values['initial_plus_contributions'][:, 1:].reshape(shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(
+            initial_investment > 0,
+            (portfolio_value / initial_investment) ** (1 / horizons) - 1,
+            0.0
+        )
+
+    metrics = {
+        'portfolio_value': portfolio_value,
+        'sp500_benchmark': values['sp500_benchmark'][:, 1:].reshape(shape),
+        'total_profit': portfolio_value - contributions,
+        'cagr': cagr,
+        'alpha_cumulative': alpha['alpha_cumulative'][:, 1:].reshape(shape)
+    }
+    return ScenarioGrid(tech_allocations, risk_levels, horizons, metrics)
+
+def get_scenario_grid(initial_investment, monthly_contribution, max_horizon=None, steps=SCENARIO_ALLOCATION_STEPS):
+    """
+    Get projection metrics over the allocation, risk level and horizon grid (cached)
+
+    Args:
+        initial_investment: Initial investment amount
+        monthly_contribution: Monthly contribution amount
+        max_horizon: Longest horizon in years (defaults to config.MAX_INVESTMENT_DURATION)
+        steps: Number of tech allocation steps across the mandate range
+
+    Returns:
+        ScenarioGrid, shared with other callers and read-only
+    """
+    if max_horizon is None:
+        max_horizon = config.MAX_INVESTMENT_DURATION
+
+    key = (float(initial_investment), float(monthly_contribution), int(max_horizon), int(steps))
+    return scenario_cache.get_or_create(
+        key, lambda: _build_scenario_grid(key[0], key[1], key[2], key[3])
+    )
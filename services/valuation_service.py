@@ -0,0 +1,103 @@
+from datetime import date, datetime, time
+import numpy as np
+import pandas as pd
+from services.etf_service import get_price_store
+from database.db_service import get_latest_etf_prices, get_user_holdings, get_holdings_by_user
+
+def get_latest_prices(symbols, as_of=None):
+    """
+    Get the latest price of every symbol on or before as_of
+
+    Ingested end-of-day closes are preferred; symbols without any fall back
+    to the price store.
+
+    Returns:
+        Float array with one price per symbol, NaN where no price is known
+    """
+    if as_of is None:
+        as_of = date.today()
+    symbols = list(symbols)
+    prices = np.full(len(symbols), np.nan)
+    if not symbols:
+        return prices
+
+    ingested = get_latest_etf_prices(symbols, as_of)
+    for i, symbol in enumerate(symbols):
+        if symbol in ingested:
+            prices[i] = ingested[symbol]
+
+    missing = np.flatnonzero(np.isnan(prices)).tolist()
+    if missing:
+        store = get_price_store(as_of)
+        known = [i for i in missing if store.has_symbol(symbols[i])]
+        if known:
+            as_of_date = datetime.combine(as_of, time())
+            dates, row = store.read([symbols[i] for i in known], as_of_date, as_of_date)
+            # Outside the store's window the symbols stay unpriced
+            if len(dates):
+                prices[known] = row[-1]
+
+    return prices
+
+def value_holdings(user_ids, symbols, units, as_of=None):
+    """
+    Value many portfolios' holdings in one dot product with the latest prices
+
+    Args:
+        user_ids: Owner of each holding row
+        symbols: ETF symbol of each holding row
+        units: Units held in each row
+
+    Returns:
+        Tuple of (portfolio ids, value per portfolio)
+    """
+    user_codes, portfolio_ids = pd.factorize(np.asarray(user_ids))
+    symbol_codes, universe = pd.factorize(np.asarray(symbols))
+
+    # Dense (portfolios x symbols) unit matrix, then one product with the price vector
+    holdings = np.zeros((len(portfolio_ids), len(universe)))
+    np.add.at(holdings, (user_codes, symbol_codes), np.asarray(units, dtype=np.float64))
+    prices = np.nan_to_num(get_latest_prices(universe, as_of))
+    return portfolio_ids, holdings @ prices
+
+def get_holding_values(user, as_of=None):
+    """Get {symbol: market value} for a user's holdings, empty if none are recorded"""
+    if getattr(user, 'id', None) is None:
+        return {}
+
+    holdings = get_user_holdings(user.id)
+    if holdings.empty:
+        return {}
+
+    prices = np.nan_to_num(get_latest_prices(holdings['symbol'], as_of))
+    values = holdings['units'].to_numpy(dtype=np.float64) * prices
+    return dict(zip(holdings['symbol'], values.tolist()))
+
+def value_all_portfolios(as_of=None):
+    """
+    Value every portfolio in the database in one pass, e.g. for an end-of-day run
+
+    Returns:
+        DataFrame with user_id, portfolio_value and source ('holdings' or
+        'initial_investment' for portfolios without recorded holdings)
+    """
+    rows = get_holdings_by_user()
+    if rows.empty:
+        return pd.DataFrame(columns=['user_id', 'portfolio_value', 'source'])
+
+    users = rows.drop_duplicates('user_id')[['user_id', 'initial_investment']].reset_index(drop=True)
+    held = rows.dropna(subset=['symbol'])
+
+    values = users['initial_investment'].to_numpy(dtype=np.float64, copy=True)
+    has_holdings = np.zeros(len(users), dtype=bool)
+    if not held.empty:
+        portfolio_ids, holding_values = value_holdings(held['user_id'], held['symbol'], held['units'], as_of)
+        positions = pd.Index(users['user_id']).get_indexer(portfolio_ids)
+        values[positions] = holding_values
+        has_holdings[positions] = True
+
+    return pd.DataFrame({
+        'user_id': users['user_id'],
+        'portfolio_value': values,
+        'source': np.where(has_holdings, 'holdings', 'initial_investment')
+    })
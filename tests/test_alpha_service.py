@@ -0,0 +1,29 @@
+import numpy as np
+from services.alpha_service import alpha_summary, compute_alpha_metrics
+
+def test_zero_contribution_projection_has_no_information_ratio():
+    # Without contributions both projections compound at a fixed rate, so the
+    # yearly alpha is constant and the tracking error is only rounding noise
+    years = np.arange(21)
+    portfolio = 10000 * 1.0975 ** years
+    benchmark = 10000 * 1.08 ** years
+
+    metrics = compute_alpha_metrics(portfolio, benchmark)
+
+    assert metrics['tracking_error'][0] == 0.0
+    assert np.isnan(metrics['information_ratio'][0])
+    assert np.isclose(metrics['active_return'][0], 0.0175)
+
+def test_one_year_projection_has_no_information_ratio():
+    summary = alpha_summary(compute_alpha_metrics([10000, 11000], [10000, 10800]))
+
+    assert summary['tracking_error'] == 0.0
+    assert np.isnan(summary['information_ratio'])
+    assert np.isclose(summary['final_alpha'], 0.02)
+
+def test_information_ratio_with_varying_alpha():
+    metrics = compute_alpha_metrics([100, 110, 115, 130], [100, 105, 115, 125])
+
+    active = np.array([1.1 - 1.05, 115 / 110 - 115 / 105, 130 / 115 - 125 / 115])
+    assert np.isclose(metrics['tracking_error'][0], active.std(ddof=1))
+    assert np.isclose(metrics['information_ratio'][0], active.mean() / active.std(ddof=1))
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import config
+from utils.downsampling import downsample_series, needs_webgl
+
+def _decimated_point_counts(series_count, days=5 * 365):
+    dates = pd.date_range('2020-01-01', periods=days, freq='D').to_numpy()
+    generator = np.random.default_rng(0)
+    counts = []
+    for _ in range(series_count):
+        values = np.cumprod(1 + generator.normal(0, 0.01, size=days))
+        x, _ = downsample_series(dates, values, config.CHART_WIDTH_PX)
+        counts.append(len(x))
+    return counts
+
+def test_webgl_used_for_comparisons_at_default_settings():
+    counts = _decimated_point_counts(2)
+
+    assert max(counts) <= config.CHART_WIDTH_PX
+    assert needs_webgl(counts, config.CHART_WEBGL_THRESHOLD)
+
+def test_single_decimated_series_stays_on_svg():
+    assert not needs_webgl(_decimated_point_counts(1), config.CHART_WEBGL_THRESHOLD)
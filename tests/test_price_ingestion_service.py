@@ -0,0 +1,42 @@
+from datetime import date
+import pandas as pd
+from services.price_ingestion_service import clean_price_chunk
+
+def test_canonical_columns_win_over_aliases():
+    chunk = pd.DataFrame({
+        'Symbol': ['XLK'],
+        'Ticker': ['VGT'],
+        'Date': ['2024-01-02'],
+        'Timestamp': ['2023-06-30'],
+        'Close': [100.0]
+    })
+
+    clean, rejected = clean_price_chunk(chunk)
+
+    assert rejected == 0
+    assert clean['symbol'].tolist() == ['XLK']
+    assert clean['date'].tolist() == [date(2024, 1, 2)]
+
+def test_adjusted_close_wins_over_close():
+    chunk = pd.DataFrame({
+        'symbol': ['XLK'],
+        'date': ['2024-01-02'],
+        'close': [100.0],
+        'Adj Close': [98.5]
+    })
+
+    clean, _ = clean_price_chunk(chunk)
+
+    assert clean['close'].tolist() == [98.5]
+
+def test_aliases_used_when_canonical_columns_are_missing():
+    chunk = pd.DataFrame({
+        'ticker': ['xlk'],
+        'timestamp': ['2024-01-02'],
+        'adjusted_close': [98.5]
+    })
+
+    clean, _ = clean_price_chunk(chunk)
+
+    assert clean[['symbol', 'close']].values.tolist() == [['XLK', 98.5]]
+    assert clean['date'].tolist() == [date(2024, 1, 2)]
@@ -0,0 +1,121 @@
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+def estimate_size(value):
+    """Estimate the memory footprint of a cached value in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by entry count and total size
+
+    Entries are evicted oldest-first whenever either the entry limit or the
+    byte limit is exceeded. Cached values are shared between callers and
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, size_of=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._size_of = size_of
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        """Get a cached value, marking it as most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries to stay within the limits"""
+        size = self._size_of(value)
+
+        with self._lock:
+            # Replace any existing entry for the key
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+
+            # Values larger than the whole cache are never stored
+            if size > self.max_bytes:
+                return value
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+        return value
+
+    def get_or_create(self, key, factory):
+        """Get a cached value, computing and storing it with factory() on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        # Compute outside the lock so slow factories don't block other sessions
+        return self.put(key, factory())
+
+    def invalidate(self, key):
+        """Remove a single entry from the cache"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def invalidate_where(self, predicate):
+        """Remove every entry whose key matches predicate(key)"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """Remove all entries from the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Get hit/miss/eviction counters and current usage"""
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
@@ -58,3 +58,13 @@ SP500_SECTOR_WEIGHTS = {
     "Communication Services": 0.08,
     "Utilities": 0.03
 }
+
+# Sleeves simulated by the Monte Carlo projection, in matrix order
+SIMULATION_SLEEVES = ("tech", "complementary", "sp500")
+
+# Correlation between the monthly returns of the simulated sleeves
+SLEEVE_CORRELATION = [
+    [1.00, 0.75, 0.85],
+    [0.75, 1.00, 0.90],
+    [0.85, 0.90, 1.00]
+]
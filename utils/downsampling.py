@@ -0,0 +1,112 @@
+import numpy as np
+
+def _as_numeric(x):
+    """Convert x values (possibly datetimes) to float64 for area calculations"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+def minmax_downsample(y, n_out):
+    """
+    Reduce a series to about n_out points by keeping the min and max of each bucket
+
+    Args:
+        y: Series values
+        n_out: Target number of points
+
+    Returns:
+        Sorted array of the indices to keep
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+
+    # Pad to equal-sized buckets so the whole search is one reshape
+    n_buckets = n_out // 2
+    bucket_size = -(-n // n_buckets)
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+
+    # Buckets made only of padding are dropped
+    filled = ~np.all(np.isnan(buckets), axis=1)
+    offsets = np.arange(n_buckets)[filled] * bucket_size
+    mins = offsets + np.nanargmin(buckets[filled], axis=1)
+    maxs = offsets + np.nanargmax(buckets[filled], axis=1)
+
+    # Always keep the end points so the visible range doesn't shrink
+    return np.unique(np.concatenate(([0, n - 1], mins, maxs)))
+
+def lttb_downsample(x, y, n_out):
+    """
+    Reduce a series to n_out points with Largest-Triangle-Three-Buckets
+
+    Each bucket keeps the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next bucket, which
+    preserves the visual shape of the line far better than striding.
+
+    Args:
+        x: Series x values (numbers or datetimes)
+        y: Series values
+        n_out: Target number of points
+
+    Returns:
+        Sorted array of the indices to keep
+    """
+    x = _as_numeric(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the points between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # Average point of every bucket, used as the third triangle vertex
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+    x_means = np.add.reduceat(x[:-1], starts) / counts
+    y_means = np.add.reduceat(y[:-1], starts) / counts
+    x_means = np.append(x_means[1:], x[-1])
+    y_means = np.append(y_means[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = starts[bucket], ends[bucket]
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+
+        # Twice the triangle area for every candidate in the bucket at once
+        areas = np.abs(
+            (x[previous] - x_means[bucket]) * (bucket_y - y[previous])
+            - (x[previous] - bucket_x) * (y_means[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+def downsample_series(x, y, n_out, method='lttb'):
+    """Downsample a series with the given method, returning the kept (x, y) values"""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if method == 'minmax':
+        indices = minmax_downsample(y, n_out)
+    else:
+        indices = lttb_downsample(x, y, n_out)
+    return x[indices], y[indices]
+
+def needs_webgl(point_counts, threshold):
+    """
+    Check whether a chart should render with WebGL
+
+    Browsers slow down with the total number of SVG points on a chart, so the
+    points of every trace count towards the threshold, not each trace alone.
+    """
+    return sum(point_counts) > threshold
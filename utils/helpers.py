@@ -1,23 +1,19 @@
-import random
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from utils.constants import RISK_RETURNS, RISK_VOLATILITY
+from utils.rng import get_generator
 
-def generate_random_seed():
-    """Generate a random seed for reproducible randomness"""
-    return int(datetime.now().timestamp())
-
-def get_random_return(risk_level, category):
+def get_random_return(risk_level, category, as_of=None):
     """Get a random return based on risk level and category"""
     mean_return = RISK_RETURNS[risk_level][category]
     volatility = RISK_VOLATILITY[risk_level][category]
     
-    # Set random seed for reproducibility
-    np.random.seed(generate_random_seed())
+    # Draw from the stream for this risk level and category, reproducible per day
+    generator = get_generator(category, f'random_return:{risk_level}', as_of or date.today())
     
     # Generate a random return from a normal distribution
-    return max(-0.3, min(0.4, np.random.normal(mean_return, volatility)))
+    return max(-0.3, min(0.4, generator.normal(mean_return, volatility)))
 
 def generate_date_range(start_date, periods, freq='Y'):
     """Generate a date range"""
@@ -73,3 +69,24 @@ def calculate_future_value(present_value, rate, time, pmt=0, pmt_type=0):
         fv_annuity = 0
     
     return fv_principal + fv_annuity
+
+def calculate_future_values(present_value, rate, time, pmt=0, pmt_type=0):
+    """
+    Vectorized calculate_future_value: every argument may be an array and they broadcast
+
+    Returns:
+        Array of future values
+    """
+    present_value, rate, time, pmt = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (present_value, rate, time, pmt))
+    )
+    
+    growth = (1 + rate) ** time
+    
+    # Annuity factor ((1 + r)^t - 1) / r, which tends to t as r -> 0
+    annuity_factor = np.divide(growth - 1, rate, out=time.copy(), where=rate != 0)
+    if pmt_type == 1:  # Beginning of period
+        annuity_factor = annuity_factor * (1 + rate)
+    
+    return present_value * growth + pmt * annuity_factor
+
@@ -0,0 +1,83 @@
+import numpy as np
+
+class LogBucketSketch:
+    """
+    Mergeable quantile sketch for a fixed number of series (e.g. time steps)
+
+    Values are counted in logarithmically sized buckets, so every quantile is
+    returned within relative_accuracy of the true value, memory is fixed by
+    the value range rather than the number of observations, and two sketches
+    built with the same settings merge by adding their counts (DDSketch-style).
+    Values at or below min_value share the lowest bucket and values above
+    max_value share the highest one.
+    """
+
+    def __init__(self, series, relative_accuracy=0.005, min_value=1.0, max_value=1e13):
+        self.series = series
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+        self._offset = int(np.ceil(np.log(min_value) / self._log_gamma))
+        self.buckets = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        self.counts = np.zeros((series, self.buckets), dtype=np.int64)
+
+    def _settings(self):
+        return (self.series, self.relative_accuracy, self.min_value, self.max_value)
+
+    @property
+    def count(self):
+        """Number of observations per series"""
+        return self.counts.sum(axis=1)
+
+    def add(self, values):
+        """
+        Add a batch of observations
+
+        Args:
+            values: Array of shape (observations, series)
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.series)
+        clipped = np.clip(values, self.min_value, self.max_value)
+        keys = np.ceil(np.log(clipped) / self._log_gamma).astype(np.int64) - self._offset
+        np.clip(keys, 0, self.buckets - 1, out=keys)
+
+        # One bincount over (series, bucket) pairs updates every series at once
+        flat_keys = keys + np.arange(self.series) * self.buckets
+        self.counts += np.bincount(flat_keys.ravel(), minlength=self.series * self.buckets).reshape(self.series, self.buckets)
+
+    def merge(self, other):
+        """Fold another sketch with the same settings into this one"""
+        if other._settings() != self._settings():
+            raise ValueError("Only sketches with the same settings can be merged")
+        self.counts += other.counts
+        return self
+
+    def quantiles(self, quantiles):
+        """
+        Estimate quantiles for every series
+
+        Args:
+            quantiles: Sequence of quantiles in [0, 1]
+
+        Returns:
+            Array of shape (quantiles, series)
+        """
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        cumulative = np.cumsum(self.counts, axis=1)
+        totals = cumulative[:, -1]
+
+        # Rank of each quantile, then the first bucket whose cumulative count passes it
+        ranks = quantiles[:, np.newaxis] * np.maximum(totals - 1, 0)
+        keys = np.empty((len(quantiles), self.series), dtype=np.int64)
+        for row in range(self.series):
+            keys[:, row] = np.searchsorted(cumulative[row], ranks[:, row], side='right')
+        np.clip(keys, 0, self.buckets - 1, out=keys)
+
+        # Bucket midpoint in the relative sense: 2 * gamma^k / (gamma + 1)
+        estimates = 2 * self._gamma ** (keys + self._offset).astype(np.float64) / (self._gamma + 1)
+        estimates = np.clip(estimates, self.min_value, self.max_value)
+        estimates[:, totals == 0] = np.nan
+        return estimates
@@ -0,0 +1,55 @@
+import hashlib
+from datetime import date, datetime
+import numpy as np
+import config
+
+def _stable_key(value):
+    """Map a key component to a stable non-negative integer, independent of PYTHONHASHSEED"""
+    if value is None:
+        return 0
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.toordinal()
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def get_seed_sequence(symbol, purpose, as_of=None):
+    """
+    Get the SeedSequence for a random stream
+
+    Args:
+        symbol: ETF symbol, sleeve or other entity the stream belongs to
+        purpose: What the numbers are used for (e.g. 'daily_prices')
+        as_of: Optional date the stream is anchored on
+
+    Returns:
+        SeedSequence derived from config.RANDOM_SEED and the key
+    """
+    return np.random.SeedSequence(
+        entropy=config.RANDOM_SEED,
+        spawn_key=(_stable_key(purpose), _stable_key(symbol), _stable_key(as_of))
+    )
+
+def get_generator(symbol, purpose, as_of=None):
+    """
+    Get an independent random generator for (symbol, purpose, as-of date)
+
+    The same key always yields the same stream, and different keys yield
+    statistically independent streams. Generators are never shared, so no
+    global random state is touched.
+    """
+    return np.random.Generator(np.random.PCG64(get_seed_sequence(symbol, purpose, as_of)))
+
+def spawn_seed_sequences(symbol, purpose, as_of=None, count=1):
+    """Split a stream into independent child SeedSequences (picklable, for worker processes)"""
+    return get_seed_sequence(symbol, purpose, as_of).spawn(count)
+
+def spawn_generators(symbol, purpose, as_of=None, count=1):
+    """Split a stream into independent child generators, e.g. one per thread or chunk"""
+    return [
+        np.random.Generator(np.random.PCG64(seed_sequence))
+        for seed_sequence in spawn_seed_sequences(symbol, purpose, as_of, count)
+    ]